@@ -0,0 +1,135 @@
+#
+#   Copyright 2020 Logical Clocks AB
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+"""Compare decoding of HiveServer2 result sets by pyhive and by the Arrow fetcher.
+
+Both paths decode the same synthetic columnar thrift row sets, so the benchmark
+measures the client side decoding cost only, independent of network and server.
+
+Usage: python benchmarks/hive_fetch_benchmark.py [--rows 1000000] [--fetch-size 10000]
+"""
+
+import argparse
+import random
+import string
+import time
+
+import pandas as pd
+import pyarrow as pa
+from pyhive import hive
+from TCLIService import ttypes
+
+from hsfs.core import hive_arrow_fetcher
+
+COLUMNS = [
+    ("id", "BIGINT_TYPE", pa.int64()),
+    ("amount", "DOUBLE_TYPE", pa.float64()),
+    ("count", "INT_TYPE", pa.int32()),
+    ("country", "STRING_TYPE", pa.string()),
+    ("event_time", "TIMESTAMP_TYPE", pa.timestamp("ns")),
+]
+
+
+def make_row_set(num_rows):
+    """Build one columnar thrift row set with a null in every tenth row."""
+    nulls = bytes([0b00000001, 0b00000100] * ((num_rows + 15) // 16))[
+        : (num_rows + 7) // 8
+    ]
+    columns = [
+        ttypes.TColumn(
+            i64Val=ttypes.TI64Column(values=list(range(num_rows)), nulls=nulls)
+        ),
+        ttypes.TColumn(
+            doubleVal=ttypes.TDoubleColumn(
+                values=[random.random() for _ in range(num_rows)], nulls=nulls
+            )
+        ),
+        ttypes.TColumn(
+            i32Val=ttypes.TI32Column(
+                values=[random.randint(0, 1000) for _ in range(num_rows)], nulls=nulls
+            )
+        ),
+        ttypes.TColumn(
+            stringVal=ttypes.TStringColumn(
+                values=[
+                    "".join(random.choices(string.ascii_uppercase, k=2))
+                    for _ in range(num_rows)
+                ],
+                nulls=nulls,
+            )
+        ),
+        ttypes.TColumn(
+            stringVal=ttypes.TStringColumn(
+                values=["2020-10-20 07:34:11.123"] * num_rows, nulls=nulls
+            )
+        ),
+    ]
+    return columns
+
+
+def decode_pyhive(row_sets):
+    """Current path: pyhive unwraps columns into rows, pandas rebuilds columns."""
+    data = []
+    for columns in row_sets:
+        unwrapped = [
+            hive._unwrap_column(column, hive_type)
+            for column, (_, hive_type, _) in zip(columns, COLUMNS)
+        ]
+        data += list(zip(*unwrapped))
+    return pd.DataFrame.from_records(data, columns=[name for name, _, _ in COLUMNS])
+
+
+def decode_arrow(row_sets):
+    """Arrow path: columns are decoded into Arrow arrays, no per-row objects."""
+    schema = pa.schema([(name, arrow_type) for name, _, arrow_type in COLUMNS])
+    batches = [
+        pa.RecordBatch.from_arrays(
+            [
+                hive_arrow_fetcher.column_to_arrow(column, hive_type, arrow_type)
+                for column, (_, hive_type, arrow_type) in zip(columns, COLUMNS)
+            ],
+            schema=schema,
+        )
+        for columns in row_sets
+    ]
+    return pa.Table.from_batches(batches, schema=schema).to_pandas()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--fetch-size", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    num_batches = args.rows // args.fetch_size
+    # unwrapping mutates the value lists, every run needs its own row sets
+    for name, decode in [("pyhive", decode_pyhive), ("arrow", decode_arrow)]:
+        timings = []
+        for _ in range(args.repeat):
+            row_sets = [make_row_set(args.fetch_size) for _ in range(num_batches)]
+            start = time.perf_counter()
+            decode(row_sets)
+            timings.append(time.perf_counter() - start)
+        print(
+            "{:>8}: best of {} runs {:.3f}s for {} rows".format(
+                name, args.repeat, min(timings), num_batches * args.fetch_size
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
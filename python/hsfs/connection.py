@@ -74,6 +74,12 @@ class Connection:
         api_key_value: API Key as string, if provided, `secrets_store` will be ignored`,
             however, this should be used with care, especially if the used notebook or
             job script is accessible by multiple parties. Defaults to `None`.
+        mysql_pool_size: Number of connections to the online feature store kept open
+            by clients without Spark, defaults to `5`.
+        mysql_max_overflow: Number of connections to the online feature store that can
+            be opened on top of `mysql_pool_size` under load, defaults to `10`.
+        mysql_pool_pre_ping: Whether to test pooled connections to the online feature
+            store for liveness before using them, defaults to `True`.
 
     # Returns
         `Connection`. Feature Store connection handle to perform operations on a
@@ -92,6 +98,9 @@ class Connection:
         cert_folder: str = CERT_FOLDER_DEFAULT,
         api_key_file: str = None,
         api_key_value: str = None,
+        mysql_pool_size: int = 5,
+        mysql_max_overflow: int = 10,
+        mysql_pool_pre_ping: bool = True,
     ):
         self._host = host
         self._port = port
@@ -103,6 +112,9 @@ class Connection:
         self._cert_folder = cert_folder
         self._api_key_file = api_key_file
         self._api_key_value = api_key_value
+        self._mysql_pool_size = mysql_pool_size
+        self._mysql_max_overflow = mysql_max_overflow
+        self._mysql_pool_pre_ping = mysql_pool_pre_ping
         self._connected = False
 
         self.connect()
@@ -187,6 +199,9 @@ class Connection:
                         self._cert_folder,
                         self._project,
                         client.get_instance()._cert_key,
+                        mysql_pool_size=self._mysql_pool_size,
+                        mysql_max_overflow=self._mysql_max_overflow,
+                        mysql_pool_pre_ping=self._mysql_pool_pre_ping,
                     )
             else:
                 client.init("hopsworks")
@@ -274,6 +289,9 @@ class Connection:
         cert_folder: str = CERT_FOLDER_DEFAULT,
         api_key_file: str = None,
         api_key_value: str = None,
+        mysql_pool_size: int = 5,
+        mysql_max_overflow: int = 10,
+        mysql_pool_pre_ping: bool = True,
     ):
         """Connection factory method, accessible through `hsfs.connection()`."""
         return cls(
@@ -287,6 +305,9 @@ class Connection:
             cert_folder,
             api_key_file,
             api_key_value,
+            mysql_pool_size,
+            mysql_max_overflow,
+            mysql_pool_pre_ping,
         )
 
     def _get_clients(self, dbfs_folder: str):
@@ -66,6 +66,33 @@ class FeatureGroupBase:
             self._feature_store_name, self._feature_store_id, self, features
         )
 
+    def get_feature(self, name: str):
+        """Get a feature of the feature group by its name.
+
+        Features can also be accessed as items of the feature group, e.g.
+        `fg["amount"]`, to build filters.
+
+        # Arguments
+            name: str. Name of the feature.
+
+        # Returns
+            `Feature`. The feature object.
+
+        # Raises
+            `KeyError`. If the feature group has no feature with the name.
+        """
+        for feat in self._features or []:
+            if feat.name == name:
+                return feat
+        raise KeyError("Feature group has no feature `{}`".format(name))
+
+    def __getitem__(self, name):
+        if not isinstance(name, str):
+            raise TypeError(
+                "Expected type `str` to get a feature, got `{}`".format(type(name))
+            )
+        return self.get_feature(name)
+
     def add_tag(self, name: str, value: str = None):
         """Attach a name/value tag to a feature group.
 
@@ -15,7 +15,12 @@
 
 from hsfs import engine
 from hsfs import feature_group as fg
-from hsfs.core import feature_group_base_engine, hudi_engine
+from hsfs.core import (
+    feature_group_base_engine,
+    hudi_engine,
+    query_constructor_api,
+    vector_server,
+)
 from hsfs.client import exceptions
 
 
@@ -40,6 +45,9 @@ class FeatureGroupEngine(feature_group_base_engine.FeatureGroupBaseEngine):
                 feat.partition = True
 
         self._feature_group_api.save(feature_group)
+        # filters built from the features are attributed to the feature group by id
+        for feat in feature_group.features:
+            feat.feature_group_id = feature_group.id
 
         offline_write_options = write_options
         online_write_options = write_options
@@ -110,12 +118,18 @@ class FeatureGroupEngine(feature_group_base_engine.FeatureGroupBaseEngine):
             offline_write_options,
             online_write_options,
         )
+        # new commits change the time bounds of queries on time travel feature groups
+        query_constructor_api.invalidate_cache(feature_group)
+        if storage != "offline":
+            vector_server.invalidate_cache(feature_group)
 
     def delete(self, feature_group):
         self._feature_group_api.delete(feature_group)
+        query_constructor_api.invalidate_cache(feature_group)
+        vector_server.invalidate_cache(feature_group)
 
     def commit_details(self, feature_group, limit):
-        hudi_engine_instance = hudi_engine.HudiEngine(
+        hudi_engine_instance = hudi_engine.get_instance(
             feature_group.feature_store_id,
             feature_group.feature_store_name,
             feature_group,
@@ -139,14 +153,16 @@ class FeatureGroupEngine(feature_group_base_engine.FeatureGroupBaseEngine):
 
     @staticmethod
     def commit_delete(feature_group, delete_df, write_options):
-        hudi_engine_instance = hudi_engine.HudiEngine(
+        hudi_engine_instance = hudi_engine.get_instance(
             feature_group.feature_store_id,
             feature_group.feature_store_name,
             feature_group,
             engine.get_instance()._spark_context,
             engine.get_instance()._spark_session,
         )
-        return hudi_engine_instance.delete_record(delete_df, write_options)
+        commit = hudi_engine_instance.delete_record(delete_df, write_options)
+        query_constructor_api.invalidate_cache(feature_group)
+        return commit
 
     def update_statistics_config(self, feature_group):
         """Update the statistics configuration of a feature group."""
@@ -190,6 +206,7 @@ class FeatureGroupEngine(feature_group_base_engine.FeatureGroupBaseEngine):
         self._feature_group_api.update_metadata(
             feature_group, copy_feature_group, "updateMetadata"
         )
+        query_constructor_api.invalidate_cache(feature_group)
 
     def update_description(self, feature_group, description):
         """Updates the description of a feature group."""
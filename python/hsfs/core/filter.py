@@ -0,0 +1,263 @@
+#
+#   Copyright 2020 Logical Clocks AB
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+import datetime
+import json
+import numbers
+
+
+class Filter:
+    """Condition on the value of a single feature.
+
+    Filters are created from features of a feature group, e.g.
+    `fg["amount"] > 10`, `fg["day"].eq("2020-12-01")` or
+    `fg["country"].isin(["SE", "DE"])`, and can be combined with `&` and `|`.
+    """
+
+    GE = "GREATER_THAN_OR_EQUAL"
+    GT = "GREATER_THAN"
+    NE = "NOT_EQUALS"
+    EQ = "EQUALS"
+    LE = "LESS_THAN_OR_EQUAL"
+    LT = "LESS_THAN"
+    IN = "IN"
+    LK = "LIKE"
+
+    _SQL_OPERATORS = {
+        GE: ">=",
+        GT: ">",
+        NE: "<>",
+        EQ: "=",
+        LE: "<=",
+        LT: "<",
+        IN: "IN",
+        LK: "LIKE",
+    }
+
+    def __init__(self, feature, condition, value):
+        self._feature = feature
+        self._condition = condition
+        self._value = value
+
+    def to_dict(self):
+        return {
+            "feature": self._feature,
+            "condition": self._condition,
+            "value": (
+                json.dumps(self._value, default=str)
+                if self._condition == self.IN
+                else str(self._value)
+            ),
+        }
+
+    def to_sql(self, column, standard_strings=False):
+        """Render the filter as SQL condition, `column(feature)` renders the column
+        reference of the feature.
+
+        The condition is valid in HiveQL, Spark SQL and MySQL, which escape quotes
+        in string literals with backslashes. With `standard_strings`, quotes are
+        escaped by doubling them as in standard SQL, for other databases.
+        """
+        column = column(self._feature)
+        if self._value is None and self._condition in [self.EQ, self.NE]:
+            return "{} IS {}NULL".format(
+                column, "NOT " if self._condition == self.NE else ""
+            )
+        if self._condition == self.IN:
+            value = "({})".format(
+                ", ".join(_sql_literal(v, standard_strings) for v in self._value)
+            )
+        else:
+            value = _sql_literal(self._value, standard_strings)
+        return "{} {} {}".format(column, self._SQL_OPERATORS[self._condition], value)
+
+    def filters(self):
+        return [self]
+
+    def __and__(self, other):
+        return Logic.And(left_f=self, **_operand("right", other))
+
+    def __or__(self, other):
+        return Logic.Or(left_f=self, **_operand("right", other))
+
+    def __bool__(self):
+        raise _truth_value_error()
+
+    def __str__(self):
+        return self.to_sql(lambda feature: feature.name)
+
+    @property
+    def feature(self):
+        return self._feature
+
+    @property
+    def condition(self):
+        return self._condition
+
+    @property
+    def value(self):
+        return self._value
+
+
+class Logic:
+    """Logical combination of filters."""
+
+    AND = "AND"
+    OR = "OR"
+    SINGLE = "SINGLE"
+
+    def __init__(self, type, left_f=None, right_f=None, left_l=None, right_l=None):
+        self._type = type
+        self._left_f = left_f
+        self._right_f = right_f
+        self._left_l = left_l
+        self._right_l = right_l
+
+    def to_dict(self):
+        return {
+            "type": self._type,
+            "leftFilter": self._left_f,
+            "rightFilter": self._right_f,
+            "leftLogic": self._left_l,
+            "rightLogic": self._right_l,
+        }
+
+    @classmethod
+    def And(cls, left_f=None, right_f=None, left_l=None, right_l=None):
+        return cls(cls.AND, left_f, right_f, left_l, right_l)
+
+    @classmethod
+    def Or(cls, left_f=None, right_f=None, left_l=None, right_l=None):
+        return cls(cls.OR, left_f, right_f, left_l, right_l)
+
+    @classmethod
+    def Single(cls, left_f):
+        return cls(cls.SINGLE, left_f)
+
+    def operands(self):
+        """Filters and logics combined by this logic, in order."""
+        return [
+            operand
+            for operand in [self._left_f, self._left_l, self._right_f, self._right_l]
+            if operand is not None
+        ]
+
+    def conjuncts(self):
+        """Split the logic into operands which all have to be satisfied."""
+        if self._type == self.OR:
+            return [self]
+        conjuncts = []
+        for operand in self.operands():
+            if isinstance(operand, Logic):
+                conjuncts.extend(operand.conjuncts())
+            else:
+                conjuncts.append(operand)
+        return conjuncts
+
+    def filters(self):
+        """All filters contained in the logic."""
+        filters = []
+        for operand in self.operands():
+            if isinstance(operand, Logic):
+                filters.extend(operand.filters())
+            else:
+                filters.append(operand)
+        return filters
+
+    def to_sql(self, column, standard_strings=False):
+        """Render the logic as SQL condition, `column(feature)` renders the column
+        reference of a feature, see `Filter.to_sql`."""
+        return _render(
+            self,
+            lambda operand: operand.to_sql(column, standard_strings),
+            lambda logic, operands: "({})".format(
+                " {} ".format(logic.type).join(operands)
+            ),
+        )
+
+    def __and__(self, other):
+        return Logic.And(left_l=self, **_operand("right", other))
+
+    def __or__(self, other):
+        return Logic.Or(left_l=self, **_operand("right", other))
+
+    def __bool__(self):
+        raise _truth_value_error()
+
+    def __str__(self):
+        return self.to_sql(lambda feature: feature.name)
+
+    @property
+    def type(self):
+        return self._type
+
+
+def to_logic(filter_or_logic):
+    if isinstance(filter_or_logic, Filter):
+        return Logic.Single(left_f=filter_or_logic)
+    elif isinstance(filter_or_logic, Logic):
+        return filter_or_logic
+    raise TypeError(
+        "Expected type `Filter` or `Logic`, got `{}`".format(type(filter_or_logic))
+    )
+
+
+def _render(operand, render_filter, render_logic):
+    if isinstance(operand, Filter):
+        return render_filter(operand)
+    operands = [
+        _render(sub_operand, render_filter, render_logic)
+        for sub_operand in operand.operands()
+    ]
+    if operand.type == Logic.SINGLE:
+        return operands[0]
+    return render_logic(operand, operands)
+
+
+def _operand(side, other):
+    if isinstance(other, Filter):
+        return {side + "_f": other}
+    elif isinstance(other, Logic):
+        return {side + "_l": other}
+    raise TypeError(
+        "Operator only supported between `Filter` and `Logic`, got `{}`".format(
+            type(other)
+        )
+    )
+
+
+def _truth_value_error():
+    # e.g. `fg["a"] > 1 and fg["b"] > 2` would silently drop the first filter
+    return TypeError(
+        "Filters have no truth value, combine them with `&` and `|` instead of "
+        "`and` and `or`."
+    )
+
+
+def _sql_literal(value, standard_strings=False):
+    if value is None:
+        return "NULL"
+    if isinstance(value, bool):
+        return "TRUE" if value else "FALSE"
+    if isinstance(value, numbers.Number):
+        return str(value)
+    if isinstance(value, datetime.datetime):
+        value = value.isoformat(sep=" ")
+    elif isinstance(value, datetime.date):
+        value = value.isoformat()
+    if standard_strings:
+        return "'{}'".format(str(value).replace("'", "''"))
+    return "'{}'".format(str(value).replace("\\", "\\\\").replace("'", "\\'"))
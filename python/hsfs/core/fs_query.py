@@ -64,6 +64,14 @@ class FsQuery:
     def query_online(self):
         return self._query_online
 
+    @query.setter
+    def query(self, query):
+        self._query = query
+
+    @query_online.setter
+    def query_online(self, query_online):
+        self._query_online = query_online
+
     @property
     def on_demand_fg_aliases(self):
         return self._on_demand_fg_aliases
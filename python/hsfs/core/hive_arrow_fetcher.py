@@ -0,0 +1,184 @@
+#
+#   Copyright 2020 Logical Clocks AB
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+from decimal import Decimal
+
+import numpy as np
+import pyarrow as pa
+from pyhive import hive
+from TCLIService import ttypes
+
+# HiveServer2 returns result sets in columnar format, one typed value list and
+# null bitmap per column. Decoding them column-wise into Arrow arrays avoids the
+# per-row tuples pyhive builds for the DB-API fetch methods.
+
+_COLUMN_ATTRIBUTES = [
+    "boolVal",
+    "byteVal",
+    "i16Val",
+    "i32Val",
+    "i64Val",
+    "doubleVal",
+    "stringVal",
+    "binaryVal",
+]
+
+_HIVE_TO_ARROW_TYPES = {
+    "BOOLEAN_TYPE": pa.bool_(),
+    "TINYINT_TYPE": pa.int8(),
+    "SMALLINT_TYPE": pa.int16(),
+    "INT_TYPE": pa.int32(),
+    "BIGINT_TYPE": pa.int64(),
+    "FLOAT_TYPE": pa.float32(),
+    "DOUBLE_TYPE": pa.float64(),
+    "BINARY_TYPE": pa.binary(),
+    "TIMESTAMP_TYPE": pa.timestamp("ns"),
+    "DATE_TYPE": pa.date32(),
+}
+
+
+def is_supported(cursor):
+    """Whether the pyhive cursor exposes the internals the result set is fetched
+    with, they are private to pyhive and may change between versions.
+
+    :param cursor: pyhive cursor, before a query is executed
+    :type cursor: pyhive.hive.Cursor
+    :rtype: bool
+    """
+    return (
+        hasattr(cursor, "_operationHandle")
+        and hasattr(getattr(cursor, "_connection", None), "client")
+        and hasattr(hive, "_check_status")
+    )
+
+
+def fetch_arrow_table(cursor, fetch_size):
+    """Fetch the result set of an executed pyhive cursor as Arrow table.
+
+    :param cursor: pyhive cursor on which a query has been executed
+    :type cursor: pyhive.hive.Cursor
+    :param fetch_size: number of rows to fetch per thrift request
+    :type fetch_size: int
+    :return: the complete result set
+    :rtype: pyarrow.Table
+    """
+    columns = _result_set_columns(cursor)
+    return pa.Table.from_batches(
+        list(iter_record_batches(cursor, fetch_size, columns)),
+        schema=_arrow_schema(columns),
+    )
+
+
+def iter_record_batches(cursor, fetch_size, columns=None):
+    """Yield the result set of an executed pyhive cursor as Arrow record batches of
+    at most `fetch_size` rows."""
+    if columns is None:
+        columns = _result_set_columns(cursor)
+    schema = _arrow_schema(columns)
+    while True:
+        request = ttypes.TFetchResultsReq(
+            operationHandle=cursor._operationHandle,
+            orientation=ttypes.TFetchOrientation.FETCH_NEXT,
+            maxRows=fetch_size,
+        )
+        response = cursor._connection.client.FetchResults(request)
+        hive._check_status(response)
+        if not response.results.columns:
+            return
+        arrays = [
+            column_to_arrow(column, hive_type, arrow_type)
+            for column, (_, hive_type, arrow_type) in zip(
+                response.results.columns, columns
+            )
+        ]
+        # hasMoreRows is not reliably set by HiveServer2, an empty batch ends the
+        # result set
+        if len(arrays[0]) == 0:
+            return
+        yield pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def column_to_arrow(column, hive_type, arrow_type):
+    """Convert a thrift `TColumn` of a Hive type to an Arrow array of `arrow_type`."""
+    values, nulls = _unwrap(column)
+    mask = _null_mask(nulls, len(values))
+
+    if hive_type in ("TIMESTAMP_TYPE", "DATE_TYPE"):
+        # temporal types are transferred as strings
+        array = pa.array(np.asarray(values, dtype=object), pa.string(), mask=mask)
+        if hive_type == "DATE_TYPE":
+            return array.cast(pa.timestamp("s")).cast(arrow_type)
+        return array.cast(arrow_type)
+    if hive_type == "DECIMAL_TYPE":
+        # decimals are transferred as strings as well, but can't be cast directly
+        return pa.array(
+            [None if null else Decimal(value) for value, null in zip(values, mask)],
+            arrow_type,
+        )
+    if pa.types.is_string(arrow_type) or pa.types.is_binary(arrow_type):
+        return pa.array(np.asarray(values, dtype=object), arrow_type, mask=mask)
+    return pa.array(
+        np.asarray(values, dtype=arrow_type.to_pandas_dtype()), arrow_type, mask=mask
+    )
+
+
+def _result_set_columns(cursor):
+    """Get name, Hive type and Arrow type of the result set columns.
+
+    The metadata is requested directly, as the DB-API description of pyhive does not
+    contain precision and scale of decimal columns.
+    """
+    request = ttypes.TGetResultSetMetadataReq(cursor._operationHandle)
+    response = cursor._connection.client.GetResultSetMetadata(request)
+    hive._check_status(response)
+
+    columns = []
+    for column in response.schema.columns:
+        primitive_entry = column.typeDesc.types[0].primitiveEntry
+        if primitive_entry is None:
+            # complex types are transferred as json strings
+            columns.append((column.columnName, "STRING_TYPE", pa.string()))
+            continue
+        hive_type = ttypes.TTypeId._VALUES_TO_NAMES[primitive_entry.type]
+        if hive_type == "DECIMAL_TYPE":
+            qualifiers = primitive_entry.typeQualifiers.qualifiers
+            arrow_type = pa.decimal128(
+                qualifiers["precision"].i32Value, qualifiers["scale"].i32Value
+            )
+        else:
+            arrow_type = _HIVE_TO_ARROW_TYPES.get(hive_type, pa.string())
+        columns.append((column.columnName, hive_type, arrow_type))
+    return columns
+
+
+def _arrow_schema(columns):
+    return pa.schema([(name, arrow_type) for name, _, arrow_type in columns])
+
+
+def _unwrap(column):
+    for attribute in _COLUMN_ATTRIBUTES:
+        typed_column = getattr(column, attribute)
+        if typed_column is not None:
+            return typed_column.values, typed_column.nulls
+    raise ValueError("Got empty column value {}".format(column))
+
+
+def _null_mask(nulls, num_values):
+    # the null bitmap is little endian per byte, trailing zero bytes are omitted
+    mask = np.unpackbits(np.frombuffer(nulls, dtype=np.uint8), bitorder="little")
+    if len(mask) < num_values:
+        mask = np.pad(mask, (0, num_values - len(mask)))
+    return mask[:num_values].astype(bool)
@@ -0,0 +1,197 @@
+#
+#   Copyright 2020 Logical Clocks AB
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from hsfs.client.exceptions import FeatureStoreException
+
+
+class HiveConnectionPool:
+    """Bounded, thread-safe pool of HiveServer2 connections.
+
+    Connections are pooled per database, since pyhive binds a connection to the
+    database it was opened with. Idle connections are closed after `idle_timeout`
+    seconds and connections which were idle for longer than
+    `health_check_interval` seconds are validated before they are handed out.
+
+    :param connection_factory: callable opening a new connection to a database
+    :type connection_factory: callable
+    :param max_size: maximum number of open connections per database
+    :type max_size: int
+    :param idle_timeout: seconds after which idle connections are closed
+    :type idle_timeout: int
+    :param health_check_interval: seconds of idleness after which a connection is
+        validated before reuse
+    :type health_check_interval: int
+    :param acquire_timeout: seconds to wait for a connection when all connections
+        to a database are checked out, e.g. by open batch iterators
+    :type acquire_timeout: int
+    """
+
+    HEALTH_CHECK_QUERY = "SELECT 1"
+
+    def __init__(
+        self,
+        connection_factory,
+        max_size=4,
+        idle_timeout=300,
+        health_check_interval=30,
+        acquire_timeout=60,
+    ):
+        self._connection_factory = connection_factory
+        self._max_size = max_size
+        self._idle_timeout = idle_timeout
+        self._health_check_interval = health_check_interval
+        self._acquire_timeout = acquire_timeout
+        self._condition = threading.Condition()
+        # database -> deque of (connection, last time returned to the pool)
+        self._idle = {}
+        # database -> number of open connections, idle and checked out
+        self._size = {}
+        self._closed = False
+
+    @contextmanager
+    def connection(self, database):
+        """Check out a connection to `database` for the duration of the context.
+
+        Connections are returned to the pool when the context exits normally and
+        are discarded if an exception was raised while they were in use.
+        """
+        conn = self._acquire(database)
+        try:
+            yield conn
+        except BaseException:
+            self._discard(database, conn)
+            raise
+        else:
+            self._release(database, conn)
+
+    def close(self):
+        """Close all idle connections and reject further checkouts."""
+        with self._condition:
+            self._closed = True
+            to_close = [conn for idle in self._idle.values() for conn, _ in idle]
+            for database, idle in self._idle.items():
+                self._size[database] -= len(idle)
+            self._idle = {}
+            self._condition.notify_all()
+        for conn in to_close:
+            self._close_quietly(conn)
+
+    def _acquire(self, database):
+        expired = []
+        deadline = time.time() + self._acquire_timeout
+        try:
+            with self._condition:
+                while True:
+                    if self._closed:
+                        raise RuntimeError("The Hive connection pool has been closed.")
+                    expired.extend(self._evict_expired())
+                    idle = self._idle.get(database)
+                    if idle:
+                        conn, last_used = idle.pop()
+                        break
+                    if self._size.get(database, 0) < self._max_size:
+                        self._size[database] = self._size.get(database, 0) + 1
+                        conn, last_used = None, None
+                        break
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        raise FeatureStoreException(
+                            "Timed out after {}s waiting for a Hive connection to "
+                            "`{}`, all {} connections are in use. Close unused "
+                            "batch iterators to release their connections.".format(
+                                self._acquire_timeout, database, self._max_size
+                            )
+                        )
+                    self._condition.wait(remaining)
+        finally:
+            # expired connections are not counted anymore, close them on every path
+            for expired_conn in expired:
+                self._close_quietly(expired_conn)
+
+        if conn is not None:
+            if time.time() - last_used < self._health_check_interval or (
+                self._is_healthy(conn)
+            ):
+                return conn
+            self._close_quietly(conn)
+
+        # the slot for the connection has been reserved above
+        try:
+            return self._connection_factory(database)
+        except BaseException:
+            self._free_slot(database)
+            raise
+
+    def _release(self, database, conn):
+        with self._condition:
+            if self._closed:
+                self._size[database] -= 1
+            else:
+                self._idle.setdefault(database, deque()).append((conn, time.time()))
+                conn = None
+            self._condition.notify()
+        if conn is not None:
+            self._close_quietly(conn)
+
+    def _discard(self, database, conn):
+        self._close_quietly(conn)
+        self._free_slot(database)
+
+    def _free_slot(self, database):
+        with self._condition:
+            self._size[database] -= 1
+            self._condition.notify()
+
+    def _evict_expired(self):
+        """Remove connections idle for longer than the idle timeout from the pool.
+
+        Has to be called holding the lock, returns the evicted connections so they
+        can be closed after releasing it.
+        """
+        expired = []
+        now = time.time()
+        for database, idle in self._idle.items():
+            # connections are appended on release, so the oldest are on the left
+            evicted = 0
+            while idle and now - idle[0][1] > self._idle_timeout:
+                expired.append(idle.popleft()[0])
+                evicted += 1
+            self._size[database] -= evicted
+        return expired
+
+    def _is_healthy(self, conn):
+        try:
+            cursor = conn.cursor()
+            try:
+                cursor.execute(self.HEALTH_CHECK_QUERY)
+                cursor.fetchall()
+            finally:
+                cursor.close()
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def _close_quietly(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
@@ -15,11 +15,42 @@
 #
 
 
+import threading
 from datetime import datetime
 
 from hsfs import feature_group_commit, storage_connector, util
 from hsfs.core import feature_group_api, storage_connector_api
 
+# Resolving the Hive JDBC connector requires a REST call, its connection string is
+# cached per feature store until the connection to Hopsworks is closed. The
+# certificate password is appended on use and never cached.
+_connection_strings = {}
+_cache_lock = threading.Lock()
+
+
+def get_instance(
+    feature_store_id, feature_store_name, feature_group, spark_context, spark_session
+):
+    """Get a hudi engine for a feature group.
+
+    Engines are cheap to create and hold the metadata of the feature group object
+    they are created for, so they are created per call and never shared between
+    threads.
+    """
+    return HudiEngine(
+        feature_store_id,
+        feature_store_name,
+        feature_group,
+        spark_context,
+        spark_session,
+    )
+
+
+def invalidate_cache():
+    """Remove the cached connection strings of the Hive JDBC connectors."""
+    with _cache_lock:
+        _connection_strings.clear()
+
 
 class HudiEngine:
     HUDI_SPARK_FORMAT = "org.apache.hudi"
@@ -79,9 +110,6 @@ class HudiEngine:
         self._storage_connector_api = storage_connector_api.StorageConnectorApi(
             self._feature_store_id
         )
-        self._connstr = self._storage_connector_api.get(
-            self._feature_store_name, storage_connector.StorageConnector.JDBC,
-        ).connection_string
 
     def save_hudi_fg(self, dataset, save_mode, operation, write_options):
         fg_commit = self._write_hudi_dataset(
@@ -180,6 +208,20 @@ class HudiEngine:
             rows_deleted=commit_metadata.getTotalRecordsDeleted(),
         )
 
+    @staticmethod
+    def get_last_commit_timestamp(spark_context, base_path):
+        """Get the instant time of the latest completed commit of a hudi table, or
+        `None` if it can't be determined."""
+        try:
+            hopsfs_conf = spark_context._jvm.org.apache.hadoop.fs.FileSystem.get(
+                spark_context._jsc.hadoopConfiguration()
+            )
+            return spark_context._jvm.org.apache.hudi.HoodieDataSourceHelpers.latestCommit(
+                hopsfs_conf, base_path
+            )
+        except Exception:
+            return None
+
     @staticmethod
     def _timestamp_to_hudiformat(timestamp):
         date_obj = datetime.fromtimestamp(timestamp / 1000)
@@ -187,12 +229,20 @@ class HudiEngine:
         return date_str
 
     def _get_conn_str(self):
+        with _cache_lock:
+            connection_string = _connection_strings.get(self._feature_store_name)
+        if connection_string is None:
+            connection_string = self._storage_connector_api.get(
+                self._feature_store_name, storage_connector.StorageConnector.JDBC,
+            ).connection_string
+            with _cache_lock:
+                _connection_strings[self._feature_store_name] = connection_string
+
         pw = util.get_cert_pw()
-        jdbc_url = (
-            self._connstr
+        return (
+            connection_string
             + "sslTrustStore=t_certificate;trustStorePassword="
             + pw
             + ";sslKeyStore=k_certificate;keyStorePassword="
             + pw
         )
-        return jdbc_url
@@ -47,6 +47,22 @@ class Join:
     def query(self):
         return self._query
 
+    @property
+    def on(self):
+        return self._on
+
+    @property
+    def left_on(self):
+        return self._left_on
+
+    @property
+    def right_on(self):
+        return self._right_on
+
+    @property
+    def join_type(self):
+        return self._join_type
+
     @query.setter
     def query(self, query):
         self._query = query
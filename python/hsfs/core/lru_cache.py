@@ -0,0 +1,99 @@
+#
+#   Copyright 2020 Logical Clocks AB
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class LRUCache:
+    """Thread-safe least recently used cache with expiring entries.
+
+    :param max_size: maximum number of entries, the least recently used entry is
+        evicted when it is exceeded
+    :type max_size: int
+    :param ttl: seconds after which entries expire, defaults to `None`, entries
+        don't expire
+    :type ttl: float, optional
+    """
+
+    def __init__(self, max_size, ttl=None):
+        self._max_size = max_size
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        # key -> (expiry time or None, value)
+        self._entries = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, key, default=None):
+        """Get the value for `key`, or `default` if it is missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (entry[0] is None or entry[0] > time.time()):
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self._misses += 1
+            return default
+
+    def put(self, key, value, ttl=None):
+        """Add or replace the value for `key`.
+
+        `ttl` overrides the time to live of the cache for this entry.
+        """
+        ttl = ttl if ttl is not None else self._ttl
+        with self._lock:
+            self._entries[key] = (
+                time.time() + ttl if ttl is not None else None,
+                value,
+            )
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def invalidate_where(self, predicate):
+        """Remove all entries for which `predicate(key, value)` is true."""
+        with self._lock:
+            for key in [
+                key
+                for key, (_, value) in self._entries.items()
+                if predicate(key, value)
+            ]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    @property
+    def hits(self):
+        """Number of lookups which found a valid entry."""
+        return self._hits
+
+    @property
+    def misses(self):
+        """Number of lookups which found no or an expired entry."""
+        return self._misses
+
+    def __len__(self):
+        return len(self._entries)
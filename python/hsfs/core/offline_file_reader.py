@@ -0,0 +1,189 @@
+#
+#   Copyright 2020 Logical Clocks AB
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+import functools
+import operator
+import posixpath
+import re
+
+import pyarrow.dataset as ds
+from pyarrow import fs
+
+from hsfs.core import filter
+
+# Hudi base files are named <file id>_<write token>_<instant time>.parquet
+_HUDI_BASE_FILE = re.compile(
+    r"^(?P<file_id>.+)_(?P<write_token>[^_]+)_(?P<instant>\d+)\.parquet$"
+)
+_HUDI_METADATA_DIR = ".hoodie"
+_HUDI_COMPLETED_INSTANT_SUFFIXES = (".commit", ".replacecommit")
+_HUDI_PENDING_INSTANT_SUFFIXES = (".inflight", ".requested")
+
+_ARROW_COMPARISONS = {
+    filter.Filter.GE: operator.ge,
+    filter.Filter.GT: operator.gt,
+    filter.Filter.NE: operator.ne,
+    filter.Filter.EQ: operator.eq,
+    filter.Filter.LE: operator.le,
+    filter.Filter.LT: operator.lt,
+}
+
+
+def filter_expression(conjuncts):
+    """Convert filters which all have to be satisfied to a dataset expression.
+
+    :param conjuncts: list of `Filter` and `Logic` objects
+    :type conjuncts: list
+    :return: the expression, `None` if there are no filters
+    :rtype: pyarrow.dataset.Expression
+    :raises ValueError: if a filter can't be evaluated by pyarrow
+    """
+    if not conjuncts:
+        return None
+    return functools.reduce(operator.and_, [_expression(c) for c in conjuncts])
+
+
+def _expression(operand):
+    if isinstance(operand, filter.Logic):
+        expressions = [_expression(sub_operand) for sub_operand in operand.operands()]
+        return functools.reduce(
+            operator.or_ if operand.type == filter.Logic.OR else operator.and_,
+            expressions,
+        )
+
+    field = ds.field(operand.feature.name)
+    if operand.condition == filter.Filter.IN:
+        return field.isin(operand.value)
+    if operand.condition == filter.Filter.LK:
+        raise ValueError("LIKE filters can't be evaluated on feature group files.")
+    if operand.value is None and operand.condition == filter.Filter.EQ:
+        return field.is_null()
+    if operand.value is None and operand.condition == filter.Filter.NE:
+        return field.is_valid()
+    return _ARROW_COMPARISONS[operand.condition](field, operand.value)
+
+
+class OfflineFileReader:
+    """Read the files of an offline feature group directly with pyarrow.
+
+    Hive tables are read as Parquet or ORC files, as given by `file_format`, with
+    Hive style partition directories, HUDI tables by selecting the latest committed
+    base file of every file group. Files are read in parallel, only the requested
+    columns are read and filter expressions are used to prune partitions and row
+    groups. HUDI tables store partition columns in the data files, filters on them
+    skip row groups based on their statistics instead.
+    """
+
+    def __init__(self, feature_group, file_format="parquet"):
+        self._feature_group = feature_group
+        self._file_format = file_format
+        self._filesystem, self._base_path = fs.FileSystem.from_uri(
+            # HopsFS is HDFS compatible
+            feature_group.location.replace("hopsfs://", "hdfs://", 1)
+        )
+
+    def read(self, columns=None, filter_expression=None, use_threads=True):
+        """Read the feature group into an Arrow table.
+
+        :param columns: names of the columns to read, defaults to all columns
+        :type columns: list, optional
+        :param filter_expression: expression rows have to satisfy, defaults to None
+        :type filter_expression: pyarrow.dataset.Expression, optional
+        :param use_threads: whether to read files in parallel, defaults to `True`
+        :type use_threads: bool, optional
+        :rtype: pyarrow.Table
+        """
+        return self._dataset().to_table(
+            columns=columns, filter=filter_expression, use_threads=use_threads
+        )
+
+    def _dataset(self):
+        files = [
+            file_info.path
+            for file_info in self._filesystem.get_file_info(
+                fs.FileSelector(self._base_path, recursive=True)
+            )
+            if file_info.type == fs.FileType.File and not self._is_hidden(file_info)
+        ]
+
+        if self._feature_group.time_travel_format == "HUDI":
+            # partition columns are contained in the data files of HUDI tables
+            return ds.dataset(
+                self._latest_file_slices(files),
+                format="parquet",
+                filesystem=self._filesystem,
+            )
+
+        return ds.dataset(
+            files,
+            format=self._file_format,
+            filesystem=self._filesystem,
+            partitioning="hive",
+            partition_base_dir=self._base_path,
+        )
+
+    def _latest_file_slices(self, files):
+        is_committed = self._committed_instant_predicate()
+        latest = {}
+        for path in files:
+            match = _HUDI_BASE_FILE.match(posixpath.basename(path))
+            if match is None or not is_committed(match.group("instant")):
+                # log files of merge on read tables or files of pending commits
+                continue
+            file_group = (posixpath.dirname(path), match.group("file_id"))
+            if file_group not in latest or latest[file_group][0] < match.group(
+                "instant"
+            ):
+                latest[file_group] = (match.group("instant"), path)
+        return [path for _, path in latest.values()]
+
+    def _committed_instant_predicate(self):
+        """Get a predicate telling whether the base files of an instant are committed.
+
+        Instants in the active timeline are committed once they completed. Hudi
+        archives completed instants only, instants older than the earliest active
+        instant are therefore committed.
+        """
+        completed = set()
+        pending = set()
+        for file_info in self._filesystem.get_file_info(
+            fs.FileSelector(posixpath.join(self._base_path, _HUDI_METADATA_DIR))
+        ):
+            instant, _, suffix = file_info.base_name.partition(".")
+            if not instant.isdigit():
+                continue
+            if "." + suffix in _HUDI_COMPLETED_INSTANT_SUFFIXES:
+                completed.add(instant)
+            elif ("." + suffix).endswith(_HUDI_PENDING_INSTANT_SUFFIXES):
+                pending.add(instant)
+        pending -= completed
+        earliest_active = min(completed | pending, default=None)
+
+        def is_committed(instant):
+            if instant in completed:
+                return True
+            return instant not in pending and (
+                earliest_active is None or instant < earliest_active
+            )
+
+        return is_committed
+
+    def _is_hidden(self, file_info):
+        relative_path = file_info.path[len(self._base_path) :].lstrip("/")
+        return any(
+            part.startswith(".") or part.startswith("_")
+            for part in relative_path.split("/")
+        )
@@ -0,0 +1,119 @@
+#
+#   Copyright 2020 Logical Clocks AB
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+"""Upserts of rows into online feature store tables.
+
+The functions of this module run on the Spark executors, one call of
+`write_partition` per partition of the dataframe to write, and must not depend on
+a Spark session.
+"""
+
+import itertools
+import time
+
+import pymysql
+
+# seconds to wait before the first retry of a failed batch, doubled on every retry
+RETRY_BACKOFF = 1
+MAX_RETRY_BACKOFF = 30
+
+
+def upsert_sql(table_name, columns, primary_keys):
+    """Get the statement inserting a row into an online table, or updating the
+    existing row with the same primary key.
+
+    :param table_name: name of the online table
+    :type table_name: str
+    :param columns: names of the columns of the rows, in order
+    :type columns: list
+    :param primary_keys: names of the primary key columns
+    :type primary_keys: list
+    :return: the statement with one placeholder per column
+    :rtype: str
+    """
+    # updating the primary key to its own value makes duplicate rows a no-op
+    update_columns = [name for name in columns if name not in primary_keys] or columns
+    return "INSERT INTO `{}` ({}) VALUES ({}) ON DUPLICATE KEY UPDATE {}".format(
+        table_name,
+        ", ".join("`{}`".format(name) for name in columns),
+        ", ".join(["%s"] * len(columns)),
+        ", ".join("`{0}` = VALUES(`{0}`)".format(name) for name in update_columns),
+    )
+
+
+def write_partition(
+    rows, connection_options, sql, batch_size, retries, rows_written=None
+):
+    """Upsert the rows of a partition in batches of `batch_size` rows.
+
+    Every batch is sent as a single multi-row statement and committed on its own.
+    Batches failing with an operational error, e.g. a lost connection or a
+    deadlock, are retried on a new connection, which is safe as upserts are
+    idempotent.
+
+    :param rows: iterator over the rows of the partition
+    :type rows: Iterator
+    :param connection_options: connection arguments of PyMySQL
+    :type connection_options: dict
+    :param sql: statement to execute for every row, see `upsert_sql`
+    :type sql: str
+    :param batch_size: number of rows per statement
+    :type batch_size: int
+    :param retries: number of times a failed batch is retried
+    :type retries: int
+    :param rows_written: accumulator of the number of rows written, defaults to
+        `None`
+    :type rows_written: pyspark.Accumulator, optional
+    """
+    conn = None
+    try:
+        for batch in _batches(rows, batch_size):
+            for attempt in range(retries + 1):
+                try:
+                    if conn is None:
+                        conn = pymysql.connect(**connection_options)
+                    with conn.cursor() as cursor:
+                        cursor.executemany(sql, batch)
+                    conn.commit()
+                    break
+                except pymysql.err.OperationalError:
+                    conn = _close(conn)
+                    if attempt == retries:
+                        raise
+                    time.sleep(min(RETRY_BACKOFF * 2**attempt, MAX_RETRY_BACKOFF))
+            if rows_written is not None:
+                rows_written.add(len(batch))
+    finally:
+        _close(conn)
+
+
+def _batches(rows, batch_size):
+    rows = iter(rows)
+    while True:
+        batch = [tuple(row) for row in itertools.islice(rows, batch_size)]
+        if not batch:
+            return
+        yield batch
+
+
+def _close(conn):
+    if conn is not None:
+        try:
+            conn.close()
+        except pymysql.err.Error:
+            # the connection is broken already
+            pass
+    return None
@@ -15,12 +15,23 @@
 #
 
 import json
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 
-from hsfs import util, engine
-from hsfs.core import join, query_constructor_api, storage_connector_api
+from hsfs import util, engine, feature_group as feature_group_module
+from hsfs.client.exceptions import FeatureStoreException
+from hsfs.core import (
+    join,
+    query_constructor_api,
+    storage_connector_api,
+    filter as filter_module,
+)
 
 
 class Query:
+    # maximum number of temporary tables registered concurrently
+    MAX_REGISTRATION_THREADS = 8
+
     def __init__(
         self,
         feature_store_name,
@@ -37,37 +48,116 @@ class Query:
         self._left_featuregroup_start_time = left_featuregroup_start_time
         self._left_featuregroup_end_time = left_featuregroup_end_time
         self._joins = []
+        self._filter = None
         self._query_constructor_api = query_constructor_api.QueryConstructorApi()
         self._storage_connector_api = storage_connector_api.StorageConnectorApi(
             feature_store_id
         )
 
     def read(self, online=False, dataframe_type="default", read_options={}):
-        query = self._query_constructor_api.construct_query(self)
-
-        if online:
-            sql_query = query.query_online
-            online_conn = self._storage_connector_api.get_online_connector()
-        else:
-            sql_query = query.query
-            online_conn = None
-
-            # Register on demand feature groups as temporary tables
-            self._register_on_demand(query.on_demand_fg_aliases)
-
-            # Register on hudi feature groups as temporary tables
-            self._register_hudi_tables(
-                query.hudi_cached_feature_groups,
-                self._feature_store_id,
-                self._feature_store_name,
+        if not online and self._is_plain_feature_group_read():
+            result = engine.get_instance().read_feature_group_files(
+                self._left_feature_group,
+                self._left_features,
+                dataframe_type,
+                self.filter_conjuncts(),
                 read_options,
             )
+            if result is not None:
+                return result
+
+        sql_query, online_conn = self._prep_read(online, read_options)
 
         return engine.get_instance().sql(
-            sql_query, self._feature_store_name, online_conn, dataframe_type
+            sql_query,
+            self._feature_store_name,
+            online_conn,
+            dataframe_type,
+            read_options=read_options,
         )
 
     def show(self, n, online=False):
+        sql_query, online_conn = self._prep_read(online, {})
+
+        return engine.get_instance().show(
+            sql_query, self._feature_store_name, n, online_conn
+        )
+
+    def head(self, n, online=False, dataframe_type="default", read_options={}):
+        """Read the first `n` rows of the query into a dataframe.
+
+        The limit is pushed down into the executed query, so only `n` rows are
+        fetched from the storage.
+
+        # Arguments
+            n: int. Number of rows to read.
+            online: bool, optional. If `True` read from online feature store, defaults
+                to `False`.
+            dataframe_type: str, optional. Possible values are `"default"`, `"spark"`,
+                `"pandas"`, `"numpy"` or `"python"`, defaults to `"default"`.
+            read_options: Additional read options as key/value pairs, defaults to `{}`.
+                On Python clients, `"arrow_fetch"` set to `True` decodes the result
+                set column-wise with pyarrow, returning Arrow types.
+
+        # Returns
+            `DataFrame`: A dataframe of the requested type with at most `n` rows.
+        """
+        sql_query, online_conn = self._prep_read(online, read_options)
+
+        return engine.get_instance().head(
+            sql_query,
+            self._feature_store_name,
+            n,
+            online_conn,
+            dataframe_type,
+            read_options,
+        )
+
+    def iter_batches(
+        self, batch_size=10000, online=False, dataframe_type="pandas", read_options={}
+    ):
+        """Read the query result as an iterator over batches of rows.
+
+        Only a single batch is held in memory at a time, which allows to process
+        results which are larger than the available memory.
+
+        # Arguments
+            batch_size: int, optional. Number of rows per batch, also used as fetch
+                size of the server-side cursor on Python clients. Defaults to `10000`.
+            online: bool, optional. If `True` read from online feature store, defaults
+                to `False`.
+            dataframe_type: str, optional. Type of the batches, possible values are
+                `"pandas"`, `"numpy"` or `"python"`, defaults to `"pandas"`.
+            read_options: Additional read options as key/value pairs, defaults to `{}`.
+                On Python clients, `"arrow_fetch"` set to `True` decodes the result
+                set column-wise with pyarrow, returning Arrow types.
+
+        # Returns
+            `Iterator`. An iterator over dataframes of the requested type.
+        """
+        sql_query, online_conn = self._prep_read(online, read_options)
+
+        return engine.get_instance().sql(
+            sql_query,
+            self._feature_store_name,
+            online_conn,
+            dataframe_type + "_batches",
+            batch_size,
+            read_options,
+        )
+
+    def _is_plain_feature_group_read(self):
+        """Whether the query reads the latest state of a single cached feature
+        group, without joins or time travel."""
+        return (
+            not self._joins
+            and self._left_featuregroup_start_time is None
+            and self._left_featuregroup_end_time is None
+            and isinstance(self._left_feature_group, feature_group_module.FeatureGroup)
+            and self._left_feature_group.location is not None
+        )
+
+    def _prep_read(self, online, read_options):
         query = self._query_constructor_api.construct_query(self)
 
         if online:
@@ -77,20 +167,18 @@ class Query:
             sql_query = query.query
             online_conn = None
 
-            # Register on demand feature groups as temporary tables
-            self._register_on_demand(query.on_demand_fg_aliases)
-
-            # Register on hudi feature groups as temporary tables
-            self._register_hudi_tables(
-                query.hudi_cached_feature_groups,
-                self._feature_store_id,
-                self._feature_store_name,
-                {},
+            # Register on demand and hudi feature groups as temporary tables
+            self._register_temporary_tables(
+                self._on_demand_registrations(query.on_demand_fg_aliases)
+                + self._hudi_registrations(
+                    query.hudi_cached_feature_groups,
+                    self._feature_store_id,
+                    self._feature_store_name,
+                    read_options,
+                )
             )
 
-        return engine.get_instance().show(
-            sql_query, self._feature_store_name, n, online_conn
-        )
+        return sql_query, online_conn
 
     def join(self, sub_query, on=[], left_on=[], right_on=[], join_type="inner"):
         self._joins.append(
@@ -98,6 +186,93 @@ class Query:
         )
         return self
 
+    def filter(self, f):
+        """Apply a filter to the rows of the query.
+
+        Filters are pushed down into the storage where possible, e.g. filters on the
+        partition key of a feature group prune the partitions which are read.
+        Unless the query is compiled on the client, filters are applied to the
+        selected columns, so filtered features have to be selected exactly once.
+        Calling `filter` multiple times combines the filters with `&`.
+
+        !!! example "Read a single day of transactions:"
+            ```python
+            fg.select_all().filter(fg["day"].eq("2020-12-01") & (fg["amount"] > 10))
+            ```
+
+        # Arguments
+            f: `Filter` or `Logic`. Filter created from features of the feature
+                groups of the query, e.g. `fg["country"].isin(["SE", "DE"])`.
+
+        # Returns
+            `Query`. The query object with the applied filter.
+        """
+        if self._filter is None:
+            self._filter = filter_module.to_logic(f)
+        else:
+            self._filter = self._filter & f
+        return self
+
+    def filter_conjuncts(self):
+        """Filters of the query and its joins which all have to be satisfied."""
+        conjuncts = [] if self._filter is None else self._filter.conjuncts()
+        for join_obj in self._joins:
+            conjuncts.extend(join_obj.query.filter_conjuncts())
+        return conjuncts
+
+    def selected_feature_names(self):
+        """Names of the features selected by the query and its joins, in order.
+
+        Join keys joined on features with the same name are selected once.
+        """
+        names = [feat.name for feat in self._left_features]
+        for join_obj in self._joins:
+            join_keys = [feat.name for feat in join_obj.on]
+            names.extend(
+                name
+                for name in join_obj.query.selected_feature_names()
+                if name not in join_keys
+            )
+        return names
+
+    def apply_filter(self, fs_query_instance):
+        """Wrap the SQL of a constructed query to apply the filters of the query.
+
+        The filters are evaluated on the selected columns of the constructed query,
+        Hive, Spark and MySQL push them down into the wrapped query.
+
+        :param fs_query_instance: query constructed by Hopsworks
+        :type fs_query_instance: FsQuery
+        :raises FeatureStoreException: if a filtered feature is not selected exactly
+            once by the query
+        """
+        conjuncts = self.filter_conjuncts()
+        if not conjuncts:
+            return fs_query_instance
+
+        names = self.selected_feature_names()
+
+        def column(feature):
+            if names.count(feature.name) != 1:
+                raise FeatureStoreException(
+                    "Cannot filter on feature `{}`, filtered features have to be "
+                    "selected exactly once by the query.".format(feature.name)
+                )
+            return "`{}`".format(feature.name)
+
+        condition = " AND ".join(conjunct.to_sql(column) for conjunct in conjuncts)
+
+        def wrap(sql_query):
+            if sql_query is None:
+                return None
+            return "SELECT * FROM ({}) hsfs_filter WHERE {}".format(
+                sql_query.strip().rstrip(";"), condition
+            )
+
+        fs_query_instance.query = wrap(fs_query_instance.query)
+        fs_query_instance.query_online = wrap(fs_query_instance.query_online)
+        return fs_query_instance
+
     def as_of(self, wallclock_time):
         for join in self._joins:
             join.query.left_featuregroup_end_time = wallclock_time
@@ -112,14 +287,24 @@ class Query:
     def json(self):
         return json.dumps(self, cls=util.FeatureStoreEncoder)
 
+    def feature_group_ids(self):
+        """Ids of all feature groups involved in the query, including joins."""
+        feature_group_ids = {self._left_feature_group.id}
+        for join_obj in self._joins:
+            feature_group_ids.update(join_obj.query.feature_group_ids())
+        return feature_group_ids
+
     def to_dict(self):
-        return {
+        query_dict = {
             "leftFeatureGroup": self._left_feature_group,
             "leftFeatures": self._left_features,
             "leftFeatureGroupStartTime": self._left_featuregroup_start_time,
             "leftFeatureGroupEndTime": self._left_featuregroup_end_time,
             "joins": self._joins,
         }
+        if self._filter is not None:
+            query_dict["filter"] = self._filter
+        return query_dict
 
     def to_string(self, online=False):
         fs_query_instance = self._query_constructor_api.construct_query(self)
@@ -128,16 +313,88 @@ class Query:
     def __str__(self):
         return self._query_constructor_api.construct_query(self)
 
-    def _register_on_demand(self, on_demand_fg_aliases):
-        if on_demand_fg_aliases is None:
+    def _register_temporary_tables(self, registrations):
+        """Run the registrations of temporary tables concurrently.
+
+        Every registration is attempted, failures are collected and raised together
+        once all registrations finished.
+
+        :param registrations: list of (alias, callable registering the table)
+        :type registrations: list
+        """
+        if not registrations:
             return
 
-        for on_demand_fg_alias in on_demand_fg_aliases:
-            engine.get_instance().register_on_demand_temporary_table(
-                on_demand_fg_alias.on_demand_feature_group.query,
-                on_demand_fg_alias.on_demand_feature_group.storage_connector,
+        with ThreadPoolExecutor(
+            max_workers=min(len(registrations), self.MAX_REGISTRATION_THREADS),
+            thread_name_prefix="hsfs-register",
+        ) as executor:
+            futures = [
+                (alias, executor.submit(register)) for alias, register in registrations
+            ]
+        errors = [
+            (alias, future.exception())
+            for alias, future in futures
+            if future.exception() is not None
+        ]
+
+        if errors:
+            raise FeatureStoreException(
+                "Failed to register {} of {} temporary tables:\n{}".format(
+                    len(errors),
+                    len(registrations),
+                    "\n".join(
+                        "  {}: {}".format(alias, error) for alias, error in errors
+                    ),
+                )
+            ) from errors[0][1]
+
+    def _on_demand_registrations(self, on_demand_fg_aliases):
+        if on_demand_fg_aliases is None:
+            return []
+
+        return [
+            (
                 on_demand_fg_alias.alias,
+                partial(
+                    engine.get_instance().register_on_demand_temporary_table,
+                    self._on_demand_query(on_demand_fg_alias.on_demand_feature_group),
+                    on_demand_fg_alias.on_demand_feature_group.storage_connector,
+                    on_demand_fg_alias.alias,
+                ),
+            )
+            for on_demand_fg_alias in on_demand_fg_aliases
+        ]
+
+    def _on_demand_query(self, on_demand_fg):
+        """Wrap the query of an on demand feature group to apply the filters which
+        only involve its features, so they are evaluated by the external database."""
+        conditions = [
+            # the external database isn't necessarily MySQL compatible
+            conjunct.to_sql(lambda feature: feature.name, standard_strings=True)
+            for conjunct in self.filter_conjuncts()
+            if all(
+                filter_obj.feature.feature_group_id == on_demand_fg.id
+                for filter_obj in conjunct.filters()
             )
+        ]
+        if not conditions:
+            return on_demand_fg.query
+        return "SELECT * FROM ({}) hsfs_filter WHERE {}".format(
+            on_demand_fg.query.strip().rstrip(";"), " AND ".join(conditions)
+        )
+
+    @property
+    def left_feature_group(self):
+        return self._left_feature_group
+
+    @property
+    def left_features(self):
+        return self._left_features
+
+    @property
+    def joins(self):
+        return self._joins
 
     @property
     def left_featuregroup_start_time(self):
@@ -145,7 +402,7 @@ class Query:
 
     @property
     def left_featuregroup_end_time(self):
-        return self._left_featuregroup_start_time
+        return self._left_featuregroup_end_time
 
     @left_featuregroup_start_time.setter
     def left_featuregroup_start_time(self, left_featuregroup_start_time):
@@ -155,10 +412,19 @@ class Query:
     def left_featuregroup_end_time(self, left_featuregroup_start_time):
         self._left_featuregroup_end_time = left_featuregroup_start_time
 
-    def _register_hudi_tables(
+    def _hudi_registrations(
         self, hudi_feature_groups, feature_store_id, feature_store_name, read_options
     ):
-        for hudi_fg in hudi_feature_groups:
-            engine.get_instance().register_hudi_temporary_table(
-                hudi_fg, feature_store_id, feature_store_name, read_options
+        return [
+            (
+                hudi_fg.alias,
+                partial(
+                    engine.get_instance().register_hudi_temporary_table,
+                    hudi_fg,
+                    feature_store_id,
+                    feature_store_name,
+                    read_options,
+                ),
             )
+            for hudi_fg in hudi_feature_groups
+        ]
@@ -0,0 +1,219 @@
+#
+#   Copyright 2020 Logical Clocks AB
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+import os
+
+from hsfs import feature_group as feature_group_module
+from hsfs.core import fs_query, join
+
+# Set to "true" to compile simple queries on the client instead of sending them to
+# the query endpoint of Hopsworks
+LOCAL_QUERY_COMPILER_ENV = "HSFS_LOCAL_QUERY_COMPILER"
+
+# Join types which have the same semantics in HiveQL and MySQL
+_JOIN_KEYWORDS = {
+    join.Join.INNER: "INNER JOIN",
+    join.Join.LEFT: "LEFT JOIN",
+    join.Join.RIGHT: "RIGHT JOIN",
+}
+
+
+class UnsupportedQuery(Exception):
+    """Raised when a query can't be compiled on the client."""
+
+
+def is_enabled():
+    return os.environ.get(LOCAL_QUERY_COMPILER_ENV, "false").lower() == "true"
+
+
+def compile_query(query):
+    """Compile a query to offline and online SQL using the metadata of the feature
+    groups available on the client.
+
+    Only queries on cached, non time travel feature groups, optionally joined with
+    equi-joins, are supported. Feature groups which are not online enabled lead to
+    a query without online SQL.
+
+    :param query: the query to compile
+    :type query: Query
+    :return: the compiled query, or `None` if the query has to be constructed by
+        Hopsworks
+    :rtype: FsQuery
+    """
+    try:
+        return QueryCompiler(query).compile()
+    except UnsupportedQuery:
+        return None
+
+
+class QueryCompiler:
+    def __init__(self, query):
+        self._query = query
+        # list of (alias, feature group) in the order they appear in the query
+        self._tables = []
+        # list of (join keyword, alias, list of (left column, right column))
+        self._joins = []
+        # list of (alias, feature name)
+        self._columns = []
+        # SQL conditions which all have to be satisfied
+        self._conditions = []
+
+    def compile(self):
+        self._add_query(self._query, join_keys=[])
+        self._check_unique_columns()
+        self._conditions = [
+            conjunct.to_sql(self._resolve_column)
+            for conjunct in self._query.filter_conjuncts()
+        ]
+        return fs_query.FsQuery(
+            self._sql(online=False),
+            (
+                self._sql(online=True)
+                if all(fg.online_enabled for _, fg in self._tables)
+                else None
+            ),
+            on_demand_feature_groups=None,
+            hudi_cached_feature_groups=None,
+        )
+
+    def _add_query(self, query, join_keys):
+        """Add the feature group of `query` and recursively its joins.
+
+        `join_keys` are the names of features of the feature group which are equal
+        to a feature with the same name on the left side of the join, they are only
+        selected once.
+        """
+        feature_group = query.left_feature_group
+        if (
+            not isinstance(feature_group, feature_group_module.FeatureGroup)
+            or feature_group.time_travel_format == "HUDI"
+            or query.left_featuregroup_start_time is not None
+            or query.left_featuregroup_end_time is not None
+        ):
+            raise UnsupportedQuery()
+
+        alias = "fg{}".format(len(self._tables))
+        self._tables.append((alias, feature_group))
+        for feature in query.left_features:
+            self._feature_name(feature_group, feature.name)
+            if feature.name not in join_keys:
+                self._columns.append((alias, feature.name))
+
+        for join_obj in query.joins:
+            self._add_join(alias, feature_group, join_obj)
+
+    def _add_join(self, left_alias, left_feature_group, join_obj):
+        if join_obj.join_type not in _JOIN_KEYWORDS:
+            raise UnsupportedQuery()
+        right_feature_group = join_obj.query.left_feature_group
+
+        if join_obj.on:
+            left_on = right_on = [feature.name for feature in join_obj.on]
+        elif join_obj.left_on or join_obj.right_on:
+            left_on = [feature.name for feature in join_obj.left_on]
+            right_on = [feature.name for feature in join_obj.right_on]
+        else:
+            # without explicit keys, join on the primary key shared by both sides
+            left_on = right_on = [
+                name
+                for name in left_feature_group.primary_key
+                if name in right_feature_group.primary_key
+            ]
+        if not left_on or len(left_on) != len(right_on):
+            raise UnsupportedQuery()
+
+        right_alias = "fg{}".format(len(self._tables))
+        self._joins.append(
+            (
+                _JOIN_KEYWORDS[join_obj.join_type],
+                right_alias,
+                [
+                    (
+                        (left_alias, self._feature_name(left_feature_group, left)),
+                        (right_alias, self._feature_name(right_feature_group, right)),
+                    )
+                    for left, right in zip(left_on, right_on)
+                ],
+            )
+        )
+        self._add_query(
+            join_obj.query,
+            join_keys=[
+                right for left, right in zip(left_on, right_on) if left == right
+            ],
+        )
+
+    def _check_unique_columns(self):
+        names = [name for _, name in self._columns]
+        if len(names) != len(set(names)):
+            raise UnsupportedQuery()
+
+    def _sql(self, online):
+        tables = {alias: fg for alias, fg in self._tables}
+        first_alias = self._tables[0][0]
+        lines = [
+            "SELECT "
+            + ", ".join(_column(alias, name) for alias, name in self._columns),
+            "FROM " + _table(tables[first_alias], first_alias, online),
+        ]
+        for keyword, alias, keys in self._joins:
+            lines.append(
+                "{} {} ON {}".format(
+                    keyword,
+                    _table(tables[alias], alias, online),
+                    " AND ".join(
+                        "{} = {}".format(_column(*left), _column(*right))
+                        for left, right in keys
+                    ),
+                )
+            )
+        if self._conditions:
+            lines.append("WHERE " + " AND ".join(self._conditions))
+        return "\n".join(lines)
+
+    def _resolve_column(self, feature):
+        """Get the column reference of a feature used in a filter.
+
+        The feature is looked up in its own feature group if it is known, otherwise
+        in the first feature group of the query which has a feature with the name.
+        """
+        for alias, feature_group in self._tables:
+            if (
+                feature.feature_group_id is None
+                or feature.feature_group_id == feature_group.id
+            ) and feature.name in [feat.name for feat in feature_group.features]:
+                return _column(alias, feature.name)
+        raise UnsupportedQuery()
+
+    @staticmethod
+    def _feature_name(feature_group, name):
+        """Validate that `name` is a feature of the feature group."""
+        if name not in [feature.name for feature in feature_group.features]:
+            raise UnsupportedQuery()
+        return name
+
+
+def _table(feature_group, alias, online):
+    table = "`{}_{}`".format(feature_group.name, feature_group.version)
+    if not online:
+        # online tables are not qualified, the online storage connector is bound to
+        # the online database of the project
+        table = "`{}`.{}".format(feature_group.feature_store_name, table)
+    return "{} `{}`".format(table, alias)
+
+
+def _column(alias, name):
+    return "`{}`.`{}`".format(alias, name)
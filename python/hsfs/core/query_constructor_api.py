@@ -14,17 +14,54 @@
 #   limitations under the License.
 #
 
+import json
+
 from hsfs import client
-from hsfs.core import fs_query
+from hsfs.core import fs_query, lru_cache, query_compiler
+
+# Constructed queries are cached process wide, keyed by the canonical json of the
+# query. The json contains the schema of all involved feature groups, so schema
+# changes lead to a cache miss. The time to live bounds how long queries of
+# time travel enabled feature groups can miss commits of other processes.
+QUERY_CACHE_SIZE = 256
+QUERY_CACHE_TTL = 60
+_query_cache = lru_cache.LRUCache(QUERY_CACHE_SIZE, QUERY_CACHE_TTL)
 
 
 class QueryConstructorApi:
     def construct_query(self, query):
+        if query_compiler.is_enabled():
+            fs_query_instance = query_compiler.compile_query(query)
+            if fs_query_instance is not None:
+                return fs_query_instance
+
+        query_json = query.json()
+        cache_key = json.dumps(json.loads(query_json), sort_keys=True)
+        cached = _query_cache.get(cache_key)
+        if cached is not None:
+            return cached[1]
+
         _client = client.get_instance()
         path_params = ["project", _client._project_id, "featurestores", "query"]
         headers = {"content-type": "application/json"}
-        return fs_query.FsQuery.from_response_json(
-            _client._send_request(
-                "PUT", path_params, headers=headers, data=query.json()
-            )
+        fs_query_instance = fs_query.FsQuery.from_response_json(
+            _client._send_request("PUT", path_params, headers=headers, data=query_json)
         )
+        # the filter is sent along, but applied on the client as well, as
+        # Hopsworks versions without filter support ignore it
+        fs_query_instance = query.apply_filter(fs_query_instance)
+        _query_cache.put(cache_key, (query.feature_group_ids(), fs_query_instance))
+        return fs_query_instance
+
+
+def invalidate_cache(feature_group=None):
+    """Remove constructed queries from the cache.
+
+    :param feature_group: only remove queries involving this feature group, defaults
+        to `None`, removing all queries
+    :type feature_group: FeatureGroup, optional
+    """
+    if feature_group is None:
+        _query_cache.clear()
+    else:
+        _query_cache.invalidate_where(lambda key, value: feature_group.id in value[0])
@@ -14,8 +14,41 @@
 #   limitations under the License.
 #
 
+import threading
+import time
+
 from hsfs import client, storage_connector
 
+# Seconds after which the cached connectors of a feature store are fetched again
+CONNECTOR_REGISTRY_TTL = 300
+
+# feature store id -> _ConnectorRegistry
+_registries = {}
+_registries_lock = threading.Lock()
+
+
+def invalidate_cache(feature_store_id=None):
+    """Drop cached storage connectors, they are fetched again on the next lookup.
+
+    :param feature_store_id: only drop the connectors of this feature store,
+        defaults to `None`, dropping the connectors of all feature stores
+    :type feature_store_id: int, optional
+    """
+    with _registries_lock:
+        if feature_store_id is None:
+            _registries.clear()
+        else:
+            _registries.pop(feature_store_id, None)
+
+
+def _get_registry(feature_store_id):
+    with _registries_lock:
+        registry = _registries.get(feature_store_id)
+        if registry is None:
+            registry = _ConnectorRegistry(feature_store_id, CONNECTOR_REGISTRY_TTL)
+            _registries[feature_store_id] = registry
+        return registry
+
 
 class StorageConnectorApi:
     CONST_ONLINE_FEATURE_STORE_CONNECTOR_SUFFIX = "_onlinefeaturestore"
@@ -33,31 +66,25 @@ class StorageConnectorApi:
         :return: the storage connector
         :rtype: StorageConnector
         """
-        _client = client.get_instance()
-        path_params = [
-            "project",
-            _client._project_id,
-            "featurestores",
-            self._feature_store_id,
-            "storageconnectors",
-            connector_type,
-        ]
-        result = [
-            conn
-            for conn in _client._send_request("GET", path_params)
-            if conn["name"] == name
-        ]
-
-        if len(result) == 1:
-            return storage_connector.StorageConnector.from_response_json(result[0])
-        else:
+        conn = _get_registry(self._feature_store_id).lookup(
+            lambda registry: registry.by_name.get((connector_type, name))
+        )
+        if conn is None:
             raise Exception(
                 "Could not find the storage connector `{}` with type `{}`.".format(
                     name, connector_type
                 )
             )
+        return conn
 
     def get_by_id(self, connector_id, connector_type):
+        conn = _get_registry(self._feature_store_id).lookup(
+            lambda registry: registry.by_id.get((connector_type, connector_id))
+        )
+        if conn is not None:
+            return conn
+
+        # not listed, request it directly to get the error of the backend
         _client = client.get_instance()
         path_params = [
             "project",
@@ -73,6 +100,48 @@ class StorageConnectorApi:
         )
 
     def get_online_connector(self):
+        conn = _get_registry(self._feature_store_id).lookup(
+            lambda registry: registry.online_connector
+        )
+        if conn is None:
+            raise Exception("Could not find online storage connector")
+        return conn
+
+
+class _ConnectorRegistry:
+    """Storage connectors of a feature store, indexed for lookups.
+
+    All connectors are fetched with a single request. They are fetched again once
+    the time to live expired or when a lookup finds no connector, as it might have
+    been created after the last fetch.
+    """
+
+    def __init__(self, feature_store_id, ttl):
+        self._feature_store_id = feature_store_id
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        self._fetched_at = None
+        # (type, name) -> connector
+        self.by_name = {}
+        # (type, id) -> connector
+        self.by_id = {}
+        self.online_connector = None
+
+    def lookup(self, find):
+        """Find a connector with `find(registry)`, refreshing the registry if it
+        expired or the connector is missing."""
+        with self._lock:
+            refreshed = False
+            if self._fetched_at is None or time.time() - self._fetched_at > self._ttl:
+                self._refresh()
+                refreshed = True
+            conn = find(self)
+            if conn is None and not refreshed:
+                self._refresh()
+                conn = find(self)
+            return conn
+
+    def _refresh(self):
         _client = client.get_instance()
         path_params = [
             "project",
@@ -81,14 +150,20 @@ class StorageConnectorApi:
             self._feature_store_id,
             "storageconnectors",
         ]
-
-        result = [
-            conn
+        connectors = [
+            storage_connector.StorageConnector.from_response_json(conn)
             for conn in _client._send_request("GET", path_params)
-            if self.CONST_ONLINE_FEATURE_STORE_CONNECTOR_SUFFIX in conn["name"]
         ]
 
-        if len(result) > 0:
-            return storage_connector.StorageConnector.from_response_json(result[0])
-        else:
-            raise Exception("Could not find online storage connector")
+        self.by_name = {(conn.connector_type, conn.name): conn for conn in connectors}
+        self.by_id = {(conn.connector_type, conn.id): conn for conn in connectors}
+        self.online_connector = next(
+            (
+                conn
+                for conn in connectors
+                if StorageConnectorApi.CONST_ONLINE_FEATURE_STORE_CONNECTOR_SUFFIX
+                in conn.name
+            ),
+            None,
+        )
+        self._fetched_at = time.time()
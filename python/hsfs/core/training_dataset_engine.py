@@ -15,6 +15,7 @@
 #
 
 from hsfs import engine
+from hsfs.client import exceptions
 from hsfs.core import training_dataset_api, tags_api
 
 
@@ -22,6 +23,8 @@ class TrainingDatasetEngine:
     OVERWRITE = "overwrite"
     APPEND = "append"
     ENTITY_TYPE = "trainingdatasets"
+    RANDOM_SPLIT = "random"
+    HASH_SPLIT = "hash"
 
     def __init__(self, feature_store_id):
         self._training_dataset_api = training_dataset_api.TrainingDatasetApi(
@@ -30,6 +33,7 @@ class TrainingDatasetEngine:
         self._tags_api = tags_api.TagsApi(feature_store_id, self.ENTITY_TYPE)
 
     def save(self, training_dataset, feature_dataframe, user_write_options):
+        self._check_split_options(training_dataset, user_write_options)
         self._training_dataset_api.post(training_dataset)
 
         write_options = engine.get_instance().write_options(
@@ -45,6 +49,7 @@ class TrainingDatasetEngine:
         engine.get_instance().training_dataset_schema_match(
             feature_dataframe, training_dataset.schema
         )
+        self._check_split_options(training_dataset, user_write_options)
 
         write_options = engine.get_instance().write_options(
             training_dataset.data_format, user_write_options
@@ -74,12 +79,60 @@ class TrainingDatasetEngine:
             path,
         )
 
+    def compact(self, training_dataset, user_write_options):
+        """Rewrite the files of every split of a training dataset as files of the
+        size given by the write options."""
+        read_options = engine.get_instance().read_options(
+            training_dataset.data_format, {}
+        )
+        write_options = engine.get_instance().write_options(
+            training_dataset.data_format, user_write_options
+        )
+        if len(training_dataset.splits) == 0:
+            paths = [training_dataset.location + "/" + training_dataset.name]
+        else:
+            paths = [
+                training_dataset.location + "/" + str(split_name)
+                for split_name in sorted(training_dataset.splits)
+            ]
+        for path in paths:
+            engine.get_instance().compact(
+                training_dataset.storage_connector,
+                training_dataset.data_format,
+                read_options,
+                write_options,
+                path,
+            )
+
     def query(self, training_dataset, online, with_label):
         return self._training_dataset_api.get_query(training_dataset, with_label)[
             "queryOnline" if online else "query"
         ]
 
+    def _check_split_options(self, training_dataset, write_options):
+        split_mode = write_options.get("split_mode", self.RANDOM_SPLIT).lower()
+        if split_mode not in [self.RANDOM_SPLIT, self.HASH_SPLIT]:
+            raise exceptions.FeatureStoreException(
+                "Unknown split mode `{}`, use `{}` or `{}`.".format(
+                    split_mode, self.RANDOM_SPLIT, self.HASH_SPLIT
+                )
+            )
+        if (
+            split_mode == self.HASH_SPLIT
+            and len(training_dataset.splits) > 0
+            and not write_options.get("split_keys")
+        ):
+            # hashing all columns would be costly and move rows between splits
+            # whenever any feature value changes
+            raise exceptions.FeatureStoreException(
+                "Hash based splits require the write option `split_keys`, the "
+                "columns identifying a row."
+            )
+
     def _write(self, training_dataset, dataset, write_options, save_mode):
+        split_mode = write_options.pop("split_mode", self.RANDOM_SPLIT).lower()
+        split_keys = write_options.pop("split_keys", None)
+
         if len(training_dataset.splits) == 0:
             path = training_dataset.location + "/" + training_dataset.name
             self._write_single(
@@ -90,6 +143,18 @@ class TrainingDatasetEngine:
                 save_mode,
                 path,
             )
+        elif split_mode == self.HASH_SPLIT:
+            engine.get_instance().write_hash_splits(
+                dataset,
+                training_dataset.storage_connector,
+                training_dataset.data_format,
+                save_mode,
+                write_options,
+                training_dataset.location,
+                training_dataset.splits,
+                training_dataset.seed,
+                split_keys,
+            )
         else:
             split_names = sorted([*training_dataset.splits])
             split_weights = [training_dataset.splits[i] for i in split_names]
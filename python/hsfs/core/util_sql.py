@@ -0,0 +1,187 @@
+#
+#   Copyright 2020 Logical Clocks AB
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+import re
+import ssl
+import threading
+from urllib.parse import parse_qsl, urlparse
+
+from sqlalchemy import create_engine
+
+_TRAILING_LIMIT = re.compile(r"\blimit\s+\d+(\s*,\s*\d+)?\s*$", re.IGNORECASE)
+
+# SQLAlchemy engines are thread-safe and own a connection pool, there should only
+# be one of them per online storage connector and pool settings in the process
+_mysql_engines = {}
+_mysql_engines_lock = threading.Lock()
+
+
+def get_mysql_engine(
+    online_conn, pool_size=5, max_overflow=10, pool_pre_ping=True, pool_recycle=3600
+):
+    """Get the process wide SQLAlchemy engine for an online storage connector.
+
+    The engine is created on first use and reused by subsequent calls with the same
+    pool settings, so that its connection pool is shared across queries and threads.
+
+    :param online_conn: JDBC storage connector of the online feature store
+    :type online_conn: StorageConnector
+    :param pool_size: number of connections to keep open in the pool
+    :type pool_size: int
+    :param max_overflow: number of connections that can be opened on top of
+        `pool_size` under load
+    :type max_overflow: int
+    :param pool_pre_ping: whether to test connections for liveness on checkout
+    :type pool_pre_ping: bool
+    :param pool_recycle: seconds after which pooled connections are recycled
+    :type pool_recycle: int
+    :return: the SQLAlchemy engine
+    :rtype: sqlalchemy.engine.Engine
+    """
+    sql_alchemy_conn_str = get_sql_alchemy_conn_str(online_conn)
+    engine_key = (
+        sql_alchemy_conn_str,
+        pool_size,
+        max_overflow,
+        pool_pre_ping,
+        pool_recycle,
+    )
+    with _mysql_engines_lock:
+        sql_alchemy_engine = _mysql_engines.get(engine_key)
+        if sql_alchemy_engine is None:
+            sql_alchemy_engine = create_engine(
+                sql_alchemy_conn_str,
+                pool_size=pool_size,
+                max_overflow=max_overflow,
+                pool_pre_ping=pool_pre_ping,
+                pool_recycle=pool_recycle,
+            )
+            _mysql_engines[engine_key] = sql_alchemy_engine
+    return sql_alchemy_engine
+
+
+def get_sql_alchemy_conn_str(online_conn):
+    online_options = online_conn.spark_options()
+    # Here we are replacing the first part of the string returned by Hopsworks,
+    # jdbc:mysql:// with the sqlalchemy one + username and password
+    return online_options["url"].replace(
+        "jdbc:mysql://",
+        "mysql+pymysql://"
+        + online_options["user"]
+        + ":"
+        + online_options["password"]
+        + "@",
+    )
+
+
+def get_mysql_connection_options(online_options):
+    """Get the connection arguments of the MySQL drivers for the Spark options of
+    an online storage connector.
+
+    The arguments are accepted by PyMySQL, they are picklable to be sent to Spark
+    executors. For aiomysql, the `ssl` argument has to be converted with
+    `get_ssl_context`. The TLS, timeout and encoding parameters of the JDBC url
+    are mapped to the corresponding arguments, others are ignored.
+    """
+    # jdbc:mysql://host:port/database?parameters
+    url = urlparse(online_options["url"].replace("jdbc:", "", 1))
+    parameters = {key.lower(): value for key, value in parse_qsl(url.query)}
+    connection_options = {
+        "host": url.hostname,
+        "port": url.port or 3306,
+        "db": url.path.lstrip("/"),
+        "user": online_options["user"],
+        "password": online_options["password"],
+    }
+
+    ssl_options = _get_ssl_options(parameters)
+    if ssl_options is not None:
+        connection_options["ssl"] = ssl_options
+    # Connector/J timeouts are in milliseconds
+    if int(parameters.get("connecttimeout", 0)) > 0:
+        connection_options["connect_timeout"] = (
+            int(parameters["connecttimeout"]) / 1000
+        )
+    if int(parameters.get("sockettimeout", 0)) > 0:
+        connection_options["read_timeout"] = int(parameters["sockettimeout"]) / 1000
+        connection_options["write_timeout"] = connection_options["read_timeout"]
+    if parameters.get("characterencoding", "").lower() in ["utf8", "utf-8"]:
+        connection_options["charset"] = "utf8mb4"
+    return connection_options
+
+
+def _get_ssl_options(parameters):
+    """Map the TLS parameters of a Connector/J url to the PyMySQL `ssl` argument,
+    `None` if TLS is disabled."""
+    ssl_mode = parameters.get("sslmode", "").upper()
+    if not ssl_mode:
+        # Connector/J 5.1 parameters, Connector/J 8 derives the mode from them
+        if parameters.get("usessl", "").lower() == "false":
+            return None
+        if parameters.get("usessl", "").lower() == "true" or (
+            parameters.get("requiressl", "").lower() == "true"
+        ):
+            ssl_mode = (
+                "VERIFY_CA"
+                if parameters.get("verifyservercertificate", "").lower() == "true"
+                else "REQUIRED"
+            )
+        else:
+            return None
+    if ssl_mode == "DISABLED":
+        return None
+    if parameters.get("trustservercertificate", "").lower() == "true":
+        ssl_mode = "REQUIRED"
+
+    ssl_options = {
+        "verify_mode": "none" if ssl_mode in ["PREFERRED", "REQUIRED"] else "required",
+        "check_hostname": ssl_mode == "VERIFY_IDENTITY",
+    }
+    if parameters.get("serversslcert"):
+        ssl_options["ca"] = parameters["serversslcert"]
+    return ssl_options
+
+
+def get_ssl_context(ssl_options):
+    """Create the SSL context for the `ssl` connection argument of PyMySQL, as
+    expected by aiomysql."""
+    context = ssl.create_default_context(cafile=ssl_options.get("ca"))
+    context.check_hostname = ssl_options["check_hostname"]
+    context.verify_mode = (
+        ssl.CERT_NONE if ssl_options["verify_mode"] == "none" else ssl.CERT_REQUIRED
+    )
+    return context
+
+
+def dispose_mysql_engines():
+    """Close the pooled connections of all engines and forget about them."""
+    with _mysql_engines_lock:
+        sql_alchemy_engines = list(_mysql_engines.values())
+        _mysql_engines.clear()
+    for sql_alchemy_engine in sql_alchemy_engines:
+        sql_alchemy_engine.dispose()
+
+
+def limit_query(sql_query, n):
+    """Restrict a query to return at most `n` rows.
+
+    The resulting query is valid in HiveQL, MySQL and Spark SQL.
+    """
+    sql_query = sql_query.strip().rstrip(";")
+    if _TRAILING_LIMIT.search(sql_query):
+        # the query is limited already, wrap it to keep the smaller of both limits
+        return "SELECT * FROM ({}) hsfs_limit LIMIT {}".format(sql_query, int(n))
+    return "{} LIMIT {}".format(sql_query, int(n))
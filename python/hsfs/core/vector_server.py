@@ -0,0 +1,586 @@
+#
+#   Copyright 2020 Logical Clocks AB
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+# aiomysql is optional, it is only required for asynchronous lookups
+try:
+    import aiomysql
+except ModuleNotFoundError:
+    aiomysql = None
+
+from hsfs.client.exceptions import FeatureStoreException
+from hsfs.core import feature_group_api, lru_cache, storage_connector_api, util_sql
+
+# Optional process wide cache of online rows, keyed by feature group id, selected
+# feature names and primary key values. Disabled by default, as rows written by
+# other processes are only visible once cached rows expired.
+_row_cache = None
+# feature group name -> time to live of its rows, overriding the default
+_row_cache_ttls = {}
+
+
+def enable_cache(max_size=10000, ttl=60, feature_group_ttls=None):
+    """Cache online rows looked up for serving vectors in this process.
+
+    Rows of a feature group are invalidated when data is inserted into its online
+    storage from this process. Rows written by other processes are visible once
+    the cached rows expired.
+
+    :param max_size: maximum number of cached rows
+    :type max_size: int
+    :param ttl: seconds after which cached rows expire
+    :type ttl: float
+    :param feature_group_ttls: time to live by feature group name, overriding `ttl`
+    :type feature_group_ttls: dict, optional
+    """
+    global _row_cache, _row_cache_ttls
+    _row_cache_ttls = dict(feature_group_ttls or {})
+    _row_cache = lru_cache.LRUCache(max_size, ttl)
+
+
+def disable_cache():
+    global _row_cache
+    _row_cache = None
+
+
+def invalidate_cache(feature_group=None):
+    """Remove cached online rows.
+
+    :param feature_group: only remove rows of this feature group, defaults to
+        `None`, removing all rows
+    :type feature_group: FeatureGroup, optional
+    """
+    row_cache = _row_cache
+    if row_cache is None:
+        return
+    if feature_group is None:
+        row_cache.clear()
+    else:
+        row_cache.invalidate_where(lambda key, value: key[0] == feature_group.id)
+
+
+def cache_stats():
+    """Get the number of hits, misses and cached rows of the online row cache.
+
+    :rtype: dict
+    """
+    row_cache = _row_cache
+    if row_cache is None:
+        return {"hits": 0, "misses": 0, "size": 0}
+    return {"hits": row_cache.hits, "misses": row_cache.misses, "size": len(row_cache)}
+
+
+class PreparedStatement:
+    """Primary key lookup of features in the online table of a feature group.
+
+    :param feature_group: the feature group to look up
+    :type feature_group: FeatureGroup
+    :param feature_names: names of the features to select
+    :type feature_names: list
+    """
+
+    def __init__(self, feature_group, feature_names):
+        self._feature_group = feature_group
+        self._feature_names = feature_names
+        self._primary_keys = list(feature_group.primary_key)
+        self._table = "`{}_{}`".format(feature_group.name, feature_group.version)
+        self._sql = "SELECT {} FROM {} WHERE {}".format(
+            _column_list(feature_names),
+            self._table,
+            " AND ".join("`{}` = %s".format(pk) for pk in self._primary_keys),
+        )
+
+    def parameters(self, entry):
+        """Get the primary key values of the statement from an entry."""
+        try:
+            # numpy scalars can't be escaped by PyMySQL
+            return [_to_python(entry[pk]) for pk in self._primary_keys]
+        except KeyError as e:
+            raise FeatureStoreException(
+                "Entry is missing primary key `{}` of feature group `{}`, "
+                "expected values for: {}".format(
+                    e.args[0], self._feature_group.name, self._primary_keys
+                )
+            )
+
+    def cached_lookup(self, entry):
+        """Get the row of an entry from the row cache, `None` if it isn't cached."""
+        row_cache = _row_cache
+        if row_cache is None:
+            return None
+        return row_cache.get(self._cache_key(self.parameters(entry)))
+
+    def lookup(self, conn, entry):
+        """Run the lookup for an entry, return a dict of feature name to value.
+
+        Features of a missing row are `None`.
+        """
+        parameters = self.parameters(entry)
+        cursor = conn.cursor()
+        try:
+            cursor.execute(self._sql, parameters)
+            row = cursor.fetchone()
+        finally:
+            cursor.close()
+        return self._row_values(parameters, row)
+
+    async def lookup_async(self, conn, entry):
+        """Run the lookup for an entry on an aiomysql connection."""
+        parameters = self.parameters(entry)
+        async with conn.cursor() as cursor:
+            await cursor.execute(self._sql, parameters)
+            row = await cursor.fetchone()
+        return self._row_values(parameters, row)
+
+    def _row_values(self, parameters, row):
+        if row is None:
+            return dict.fromkeys(self._feature_names)
+        values = dict(zip(self._feature_names, row))
+        self._cache_row(parameters, values)
+        return values
+
+    def batch_lookup(self, conn, entries, chunk_size):
+        """Run the lookup for many entries with one query per chunk of keys.
+
+        :return: feature values by feature name for every entry, in order
+        :rtype: list
+        """
+        keys = [tuple(self.parameters(entry)) for entry in entries]
+        rows = {}
+        unique_keys = []
+        row_cache = _row_cache
+        for key in dict.fromkeys(keys):
+            cached = None if row_cache is None else row_cache.get(self._cache_key(key))
+            if cached is None:
+                unique_keys.append(key)
+            else:
+                rows[key] = cached
+
+        cursor = conn.cursor()
+        try:
+            for start in range(0, len(unique_keys), chunk_size):
+                chunk = unique_keys[start : start + chunk_size]
+                cursor.execute(
+                    self._batch_sql(len(chunk)),
+                    [value for key in chunk for value in key],
+                )
+                for row in cursor.fetchall():
+                    # rows are matched by the position of their key in the chunk,
+                    # as the returned key values can differ in type or case
+                    key = chunk[row[0]]
+                    rows[key] = dict(zip(self._feature_names, row[1:]))
+                    self._cache_row(key, rows[key])
+        finally:
+            cursor.close()
+
+        missing = dict.fromkeys(self._feature_names)
+        return [rows.get(key, missing) for key in keys]
+
+    def _cache_key(self, parameters):
+        # statements of different training datasets select different features
+        return (
+            self._feature_group.id,
+            tuple(self._feature_names),
+            tuple(parameters),
+        )
+
+    def _cache_row(self, parameters, values):
+        row_cache = _row_cache
+        if row_cache is not None:
+            # missing rows are not cached, they might be inserted any moment
+            row_cache.put(
+                self._cache_key(parameters),
+                values,
+                ttl=_row_cache_ttls.get(self._feature_group.name),
+            )
+
+    def _batch_sql(self, num_keys):
+        """Get the query joining the rows with `num_keys` keys, which are selected
+        together with their position in the parameters."""
+        key_columns = ", ".join(
+            "%s AS `hsfs_key_{}`".format(i) for i in range(len(self._primary_keys))
+        )
+        keys = " UNION ALL ".join(
+            "SELECT {} AS `hsfs_key_index`, {}".format(index, key_columns)
+            for index in range(num_keys)
+        )
+        join_condition = " AND ".join(
+            "`fg`.`{}` = `keys`.`hsfs_key_{}`".format(pk, i)
+            for i, pk in enumerate(self._primary_keys)
+        )
+        return (
+            "SELECT `keys`.`hsfs_key_index`, {} FROM ({}) `keys` JOIN {} `fg` ON {}"
+        ).format(
+            ", ".join("`fg`.`{}`".format(name) for name in self._feature_names),
+            keys,
+            self._table,
+            join_condition,
+        )
+
+    @property
+    def feature_group(self):
+        return self._feature_group
+
+    @property
+    def feature_names(self):
+        return self._feature_names
+
+    @property
+    def primary_keys(self):
+        return self._primary_keys
+
+    @property
+    def sql(self):
+        return self._sql
+
+
+class VectorServer:
+    """Look up feature vectors in the online feature store.
+
+    Lookup statements are prepared once per training dataset from the metadata of
+    its feature groups and run over pooled connections to the online feature store.
+    """
+
+    # number of primary keys looked up per query in batch lookups
+    BATCH_CHUNK_SIZE = 1000
+    # maximum number of feature groups looked up concurrently
+    MAX_LOOKUP_THREADS = 8
+    # maximum number of connections of the pool for asynchronous lookups
+    ASYNC_POOL_SIZE = 10
+
+    def __init__(self, feature_store_id):
+        self._feature_group_api = feature_group_api.FeatureGroupApi(feature_store_id)
+        self._storage_connector_api = storage_connector_api.StorageConnectorApi(
+            feature_store_id
+        )
+        self._lock = threading.Lock()
+        self._mysql_engine = None
+        # task creating the aiomysql pool and the event loop it belongs to
+        self._async_pool_task = None
+        self._async_pool_loop = None
+        # bounds the lookups using a connection of the pool to its size
+        self._async_pool_slots = None
+        # prepared statements of the training dataset and the names of the
+        # features of the vector in order
+        self._prepared_statements = None
+        self._feature_names = None
+
+    def init_serving(self, training_dataset):
+        """Prepare the lookup statements of a training dataset.
+
+        Features are grouped by the feature group they were selected from and the
+        primary key of every feature group is fetched from the feature store.
+        Label features are not part of the vector.
+        """
+        with self._lock:
+            if self._prepared_statements is not None:
+                return
+
+            features = sorted(
+                [feat for feat in training_dataset.schema if not feat.label],
+                key=lambda feat: feat.index,
+            )
+            features_by_feature_group = {}
+            for feat in features:
+                if feat.featuregroup is None:
+                    raise FeatureStoreException(
+                        "Feature `{}` of the training dataset is not linked to a "
+                        "feature group, serving vectors are only available for "
+                        "training datasets created from a query.".format(feat.name)
+                    )
+                fg_key = (feat.featuregroup["name"], feat.featuregroup["version"])
+                features_by_feature_group.setdefault(fg_key, []).append(feat.name)
+
+            self._prepared_statements = [
+                PreparedStatement(
+                    self._feature_group_api.get(
+                        name, version, feature_group_api.FeatureGroupApi.CACHED
+                    ),
+                    feature_names,
+                )
+                for (name, version), feature_names in features_by_feature_group.items()
+            ]
+            self._feature_names = [feat.name for feat in features]
+
+    def get_feature_vector(self, training_dataset, entry):
+        """Look up the feature vector of a training dataset for an entry.
+
+        :param training_dataset: the training dataset
+        :type training_dataset: TrainingDataset
+        :param entry: primary key values of all feature groups, by feature name
+        :type entry: dict
+        :return: feature values in the order of the training dataset
+        :rtype: list
+        """
+        self.init_serving(training_dataset)
+        values = {}
+        uncached = []
+        for prepared_statement in self._prepared_statements:
+            cached = prepared_statement.cached_lookup(entry)
+            if cached is None:
+                uncached.append(prepared_statement)
+            else:
+                values.update(cached)
+
+        if uncached:
+
+            def lookup(conn):
+                for prepared_statement in uncached:
+                    values.update(prepared_statement.lookup(conn, entry))
+
+            self._run_lookup(lookup)
+        return [values[name] for name in self._feature_names]
+
+    async def get_feature_vector_async(self, training_dataset, entry):
+        """Look up the feature vector of a training dataset for an entry without
+        blocking the event loop.
+
+        The feature groups are looked up concurrently on connections of an aiomysql
+        pool. Connections of cancelled lookups are closed instead of being returned
+        to the pool, as the result of their query is still pending.
+
+        :param training_dataset: the training dataset
+        :type training_dataset: TrainingDataset
+        :param entry: primary key values of all feature groups, by feature name
+        :type entry: dict
+        :return: feature values in the order of the training dataset
+        :rtype: list
+        """
+        loop = asyncio.get_running_loop()
+        if self._prepared_statements is None:
+            # fetching the metadata of the feature groups blocks
+            await loop.run_in_executor(None, self.init_serving, training_dataset)
+
+        values = {}
+        uncached = []
+        for prepared_statement in self._prepared_statements:
+            cached = prepared_statement.cached_lookup(entry)
+            if cached is None:
+                uncached.append(prepared_statement)
+            else:
+                values.update(cached)
+
+        if uncached:
+            pool = await self._get_async_pool()
+            for result in await asyncio.gather(
+                *[
+                    self._lookup_async(pool, prepared_statement, entry)
+                    for prepared_statement in uncached
+                ]
+            ):
+                values.update(result)
+        return [values[name] for name in self._feature_names]
+
+    async def close_async(self):
+        """Close the connections of the aiomysql pool."""
+        if self._async_pool_task is None:
+            return
+        pool = await self._async_pool_task
+        self._async_pool_task = None
+        await _close_pool(pool)
+
+    async def _lookup_async(self, pool, prepared_statement, entry):
+        # aiomysql doesn't wake up lookups waiting in `acquire` when a closed
+        # connection is released, so lookups never wait for a connection of the
+        # pool, but for a slot, which is freed in any case
+        async with self._async_pool_slots:
+            conn = await pool.acquire()
+            try:
+                return await prepared_statement.lookup_async(conn, entry)
+            except BaseException:
+                # the connection is in an unknown state after errors and
+                # cancellation, the pool replaces closed connections
+                conn.close()
+                raise
+            finally:
+                pool.release(conn)
+
+    async def _get_async_pool(self):
+        loop = asyncio.get_running_loop()
+        if self._async_pool_task is not None and self._async_pool_loop is not loop:
+            self._close_stale_async_pool()
+        if self._async_pool_task is None:
+            # concurrent lookups wait for the same pool to be created
+            self._async_pool_task = loop.create_task(self._create_async_pool())
+            self._async_pool_loop = loop
+            self._async_pool_slots = asyncio.Semaphore(self.ASYNC_POOL_SIZE)
+        try:
+            return await asyncio.shield(self._async_pool_task)
+        except Exception:
+            self._async_pool_task = None
+            raise
+
+    def _close_stale_async_pool(self):
+        """Close the pool created on another event loop, its connections can't be
+        used on the running loop."""
+        task, loop = self._async_pool_task, self._async_pool_loop
+        self._async_pool_task = None
+        if not task.done() or task.cancelled() or task.exception() is not None:
+            return
+        pool = task.result()
+        if loop.is_closed():
+            # the transports of the connections can't be closed without their loop,
+            # their sockets are closed once the pool is garbage collected
+            return
+        asyncio.run_coroutine_threadsafe(_close_pool(pool), loop)
+
+    async def _create_async_pool(self):
+        if aiomysql is None:
+            raise FeatureStoreException(
+                "Asynchronous lookups require the `aiomysql` package."
+            )
+        online_conn = await asyncio.get_running_loop().run_in_executor(
+            None, self._storage_connector_api.get_online_connector
+        )
+        connection_options = util_sql.get_mysql_connection_options(
+            online_conn.spark_options()
+        )
+        if "ssl" in connection_options:
+            connection_options["ssl"] = util_sql.get_ssl_context(
+                connection_options["ssl"]
+            )
+        return await aiomysql.create_pool(
+            minsize=1,
+            maxsize=self.ASYNC_POOL_SIZE,
+            # don't keep read snapshots open in pooled connections
+            autocommit=True,
+            **connection_options
+        )
+
+    def get_feature_vectors(
+        self, training_dataset, entries, dataframe_type="numpy", chunk_size=None
+    ):
+        """Look up the feature vectors of a training dataset for many entries.
+
+        Every feature group is queried with one join per chunk of primary keys and
+        the feature groups are queried concurrently.
+
+        :param training_dataset: the training dataset
+        :type training_dataset: TrainingDataset
+        :param entries: primary key values of all feature groups, by feature name
+        :type entries: list
+        :param dataframe_type: type of the result, `"numpy"`, `"pandas"` or
+            `"python"`, defaults to `"numpy"`
+        :type dataframe_type: str
+        :param chunk_size: number of keys per query, defaults to `BATCH_CHUNK_SIZE`
+        :type chunk_size: int, optional
+        :return: one feature vector per entry, in the order of the entries
+        """
+        if dataframe_type.lower() not in ["numpy", "pandas", "python"]:
+            raise TypeError(
+                "Dataframe type `{}` not supported for serving vectors.".format(
+                    dataframe_type
+                )
+            )
+        self.init_serving(training_dataset)
+        chunk_size = chunk_size or self.BATCH_CHUNK_SIZE
+
+        def lookup(prepared_statement):
+            return self._run_lookup(
+                lambda conn: prepared_statement.batch_lookup(conn, entries, chunk_size)
+            )
+
+        if entries:
+            with ThreadPoolExecutor(
+                max_workers=min(
+                    len(self._prepared_statements), self.MAX_LOOKUP_THREADS
+                ),
+                thread_name_prefix="hsfs-lookup",
+            ) as executor:
+                results = list(executor.map(lookup, self._prepared_statements))
+        else:
+            results = []
+
+        vectors = []
+        for i in range(len(entries)):
+            values = {}
+            for result in results:
+                values.update(result[i])
+            vectors.append([values[name] for name in self._feature_names])
+
+        if dataframe_type.lower() == "python":
+            return vectors
+        # pandas infers a type per feature, as when reading dataframes
+        dataframe = pd.DataFrame(vectors, columns=self._feature_names)
+        if dataframe_type.lower() == "pandas":
+            return dataframe
+        return dataframe.values
+
+    def get_online_row(self, feature_group, entry):
+        """Look up the row of a feature group for an entry.
+
+        :param feature_group: the feature group
+        :type feature_group: FeatureGroup
+        :param entry: primary key values of the feature group, by feature name
+        :type entry: dict
+        :return: feature name to value, values are `None` if the row doesn't exist
+        :rtype: dict
+        """
+        if not feature_group.online_enabled:
+            raise FeatureStoreException(
+                "Feature group `{}` is not online enabled, rows can only be looked "
+                "up in the online feature store.".format(feature_group.name)
+            )
+        prepared_statement = PreparedStatement(
+            feature_group, [feat.name for feat in feature_group.features]
+        )
+        return self._run_lookup(lambda conn: prepared_statement.lookup(conn, entry))
+
+    def _run_lookup(self, lookup):
+        """Run `lookup(conn)` on a pooled DB-API connection of the online feature
+        store and return its result.
+
+        Pooled connections are not pinged before use, which would add a round trip
+        to every lookup. A lookup failing because the server closed its connection
+        is retried once on a new connection.
+        """
+        if self._mysql_engine is None:
+            self._mysql_engine = util_sql.get_mysql_engine(
+                self._storage_connector_api.get_online_connector(), pool_pre_ping=False
+            )
+        for attempt in range(2):
+            conn = self._mysql_engine.raw_connection()
+            try:
+                return lookup(conn)
+            except Exception as e:
+                if attempt > 0 or not self._mysql_engine.dialect.is_disconnect(
+                    e, conn.connection, None
+                ):
+                    raise
+                # discard the connection instead of returning it to the pool
+                conn.invalidate(e)
+            finally:
+                # returns the connection to the pool
+                conn.close()
+
+
+async def _close_pool(pool):
+    pool.close()
+    await pool.wait_closed()
+
+
+def _column_list(names):
+    return ", ".join("`{}`".format(name) for name in names)
+
+
+def _to_python(value):
+    return value.item() if isinstance(value, np.generic) else value
@@ -14,18 +14,36 @@
 #   limitations under the License.
 #
 
+from hsfs.core import hudi_engine
 from hsfs.engine import spark, hive
 
 _engine = None
 
 
-def init(engine_type, host=None, cert_folder=None, project=None, cert_key=None):
+def init(
+    engine_type,
+    host=None,
+    cert_folder=None,
+    project=None,
+    cert_key=None,
+    mysql_pool_size=5,
+    mysql_max_overflow=10,
+    mysql_pool_pre_ping=True,
+):
     global _engine
     if not _engine:
         if engine_type == "spark":
             _engine = spark.Engine()
         elif engine_type == "hive":
-            _engine = hive.Engine(host, cert_folder, project, cert_key)
+            _engine = hive.Engine(
+                host,
+                cert_folder,
+                project,
+                cert_key,
+                mysql_pool_size=mysql_pool_size,
+                mysql_max_overflow=mysql_max_overflow,
+                mysql_pool_pre_ping=mysql_pool_pre_ping,
+            )
 
 
 def get_instance():
@@ -37,4 +55,7 @@ def get_instance():
 
 def stop():
     global _engine
+    if isinstance(_engine, hive.Engine):
+        _engine.close()
     _engine = None
+    hudi_engine.invalidate_cache()
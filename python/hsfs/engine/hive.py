@@ -15,36 +15,314 @@
 #
 
 import os
+import warnings
+from functools import partial
+
 import pandas as pd
 from pyhive import hive
-from sqlalchemy import create_engine
+from pymysql.cursors import SSCursor
+
+from hsfs import util
+from hsfs.core import hive_connection_pool, util_sql
+
+# pyarrow is optional, if available HiveServer2 results can be decoded column-wise
+# and feature groups can be read directly from their files
+try:
+    import pyarrow
+    from hsfs.core import hive_arrow_fetcher, offline_file_reader
+except ModuleNotFoundError:
+    pyarrow = None
+    hive_arrow_fetcher = None
+    offline_file_reader = None
 
 
 class Engine:
-    def __init__(self, host, cert_folder, project, cert_key):
+    DEFAULT_BATCH_SIZE = 10000
+    BATCH_DATAFRAME_TYPES = [
+        "pandas_batches",
+        "numpy_batches",
+        "python_batches",
+        "pyarrow_batches",
+    ]
+
+    def __init__(
+        self,
+        host,
+        cert_folder,
+        project,
+        cert_key,
+        mysql_pool_size=5,
+        mysql_max_overflow=10,
+        mysql_pool_pre_ping=True,
+    ):
         self._host = host
         self._cert_folder = os.path.join(cert_folder, host, project)
         self._cert_key = cert_key
+        self._mysql_pool_size = mysql_pool_size
+        self._mysql_max_overflow = mysql_max_overflow
+        self._mysql_pool_pre_ping = mysql_pool_pre_ping
+        self._hive_connection_pool = hive_connection_pool.HiveConnectionPool(
+            self._create_hive_connection
+        )
+        self._direct_read_enabled = offline_file_reader is not None
+        # (feature store, feature group name, version, id) -> file format of the
+        # offline table
+        self._file_formats = {}
 
-    def sql(self, sql_query, feature_store, online_conn, dataframe_type):
+    def sql(
+        self,
+        sql_query,
+        feature_store,
+        online_conn,
+        dataframe_type,
+        batch_size=None,
+        read_options={},
+    ):
         if not online_conn:
-            return self._sql_offline(sql_query, feature_store, dataframe_type)
+            return self._sql_offline(
+                sql_query, feature_store, dataframe_type, batch_size, read_options
+            )
         else:
-            return self._jdbc(sql_query, online_conn, dataframe_type)
+            return self._jdbc(sql_query, online_conn, dataframe_type, batch_size)
 
-    def _sql_offline(self, sql_query, feature_store, dataframe_type):
+    def _sql_offline(
+        self, sql_query, feature_store, dataframe_type, batch_size=None, read_options={}
+    ):
         print("Lazily executing query: {}".format(sql_query))
-        with self._create_hive_connection(feature_store) as hive_conn:
+        # decoding the result set into Arrow relies on pyhive internals and returns
+        # Arrow types, e.g. dates instead of strings, so it is opt-in
+        if read_options.get("arrow_fetch", False) and hive_arrow_fetcher is not None:
+            if dataframe_type.lower() in self.BATCH_DATAFRAME_TYPES:
+                return self._iter_arrow_batches(
+                    sql_query, feature_store, dataframe_type, batch_size
+                )
+            with self._hive_connection_pool.connection(feature_store) as hive_conn:
+                cursor = hive_conn.cursor()
+                try:
+                    if self._arrow_fetch_supported(cursor):
+                        cursor.execute(sql_query)
+                        return self._return_dataframe_type(
+                            hive_arrow_fetcher.fetch_arrow_table(
+                                cursor, self.DEFAULT_BATCH_SIZE
+                            ),
+                            dataframe_type,
+                        )
+                finally:
+                    cursor.close()
+
+        if dataframe_type.lower() in self.BATCH_DATAFRAME_TYPES:
+            return self._iter_batches(
+                sql_query,
+                partial(self._hive_connection_pool.connection, feature_store),
+                self._open_hive_cursor,
+                dataframe_type,
+                batch_size,
+            )
+        with self._hive_connection_pool.connection(feature_store) as hive_conn:
             result_df = pd.read_sql(sql_query, hive_conn)
         return self._return_dataframe_type(result_df, dataframe_type)
 
-    def _jdbc(self, sql_query, connector, dataframe_type):
+    def _jdbc(self, sql_query, connector, dataframe_type, batch_size=None):
+        if dataframe_type.lower() in self.BATCH_DATAFRAME_TYPES:
+            return self._iter_batches(
+                sql_query,
+                partial(self._create_mysql_connection, connector),
+                self._open_mysql_cursor,
+                dataframe_type,
+                batch_size,
+            )
         with self._create_mysql_connection(connector) as mysql_conn:
             result_df = pd.read_sql(sql_query, mysql_conn)
         return self._return_dataframe_type(result_df, dataframe_type)
 
+    def _iter_batches(
+        self, sql_query, connection_factory, cursor_factory, dataframe_type, batch_size
+    ):
+        """Yield the query result in batches of `batch_size` rows.
+
+        The connection is only opened once iteration starts and stays open until the
+        last batch was fetched. Rows are fetched from a server-side cursor, so only
+        the current batch is held in memory.
+        """
+        batch_type = dataframe_type.lower()[: -len("_batches")]
+        batch_size = batch_size or self.DEFAULT_BATCH_SIZE
+        with connection_factory() as conn:
+            cursor = cursor_factory(conn, batch_size)
+            try:
+                cursor.execute(sql_query)
+                columns = [column[0] for column in cursor.description]
+                while True:
+                    rows = cursor.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    yield self._return_dataframe_type(
+                        pd.DataFrame.from_records(rows, columns=columns), batch_type
+                    )
+            finally:
+                cursor.close()
+
+    def _iter_arrow_batches(self, sql_query, feature_store, dataframe_type, batch_size):
+        """Yield the query result in batches of `batch_size` rows, decoded from the
+        columnar thrift result set into Arrow record batches."""
+        batch_type = dataframe_type.lower()[: -len("_batches")]
+        with self._hive_connection_pool.connection(feature_store) as hive_conn:
+            cursor = hive_conn.cursor()
+            try:
+                if self._arrow_fetch_supported(cursor):
+                    cursor.execute(sql_query)
+                    for record_batch in hive_arrow_fetcher.iter_record_batches(
+                        cursor, batch_size or self.DEFAULT_BATCH_SIZE
+                    ):
+                        yield self._return_dataframe_type(record_batch, batch_type)
+                    return
+            finally:
+                cursor.close()
+
+        yield from self._iter_batches(
+            sql_query,
+            partial(self._hive_connection_pool.connection, feature_store),
+            self._open_hive_cursor,
+            dataframe_type,
+            batch_size,
+        )
+
+    @staticmethod
+    def _arrow_fetch_supported(cursor):
+        if hive_arrow_fetcher.is_supported(cursor):
+            return True
+        warnings.warn(
+            "The installed version of pyhive is not supported by the read option "
+            "`arrow_fetch`, fetching the result set row by row instead.",
+            util.StorageWarning,
+        )
+        return False
+
+    @staticmethod
+    def _open_hive_cursor(hive_conn, fetch_size):
+        # the array size is the number of rows fetched per thrift request
+        return hive_conn.cursor(arraysize=fetch_size)
+
+    @staticmethod
+    def _open_mysql_cursor(mysql_conn, fetch_size):
+        # unbuffered cursor, rows are read from the socket as they are fetched
+        return mysql_conn.connection.cursor(SSCursor)
+
+    def read_feature_group_files(
+        self,
+        feature_group,
+        features,
+        dataframe_type,
+        filter_conjuncts=[],
+        read_options={},
+    ):
+        """Read a feature group directly from its files, bypassing HiveServer2.
+
+        The read options `direct_read`, `False` to always read through a query, and
+        `use_threads` apply to direct reads.
+
+        Returns `None` if the files can't be read directly, in which case the
+        feature group has to be read through a query.
+        """
+        if (
+            not self._direct_read_enabled
+            or not read_options.get("direct_read", True)
+            or dataframe_type.lower() in self.BATCH_DATAFRAME_TYPES
+        ):
+            return None
+
+        try:
+            filter_expression = offline_file_reader.filter_expression(filter_conjuncts)
+        except ValueError:
+            return None
+
+        if feature_group.time_travel_format == "HUDI":
+            file_format = "parquet"
+        else:
+            file_format = self._get_file_format(feature_group)
+            if file_format is None:
+                return None
+
+        try:
+            reader = offline_file_reader.OfflineFileReader(feature_group, file_format)
+        except Exception as e:
+            # the file system is not reachable from this environment, don't retry
+            self._direct_read_enabled = False
+            warnings.warn(
+                "Feature group files can't be read directly, falling back to reading "
+                "through HiveServer2: {}".format(e),
+                util.StorageWarning,
+            )
+            return None
+
+        try:
+            result_table = reader.read(
+                columns=[feat.name for feat in features],
+                filter_expression=filter_expression,
+                use_threads=read_options.get("use_threads", True),
+            )
+        except Exception as e:
+            warnings.warn(
+                "Reading feature group files failed, falling back to reading "
+                "through HiveServer2: {}".format(e),
+                util.StorageWarning,
+            )
+            return None
+        return self._return_dataframe_type(result_table, dataframe_type)
+
+    def _get_file_format(self, feature_group):
+        """Get the file format of the offline table of a feature group from the Hive
+        metastore, `"parquet"`, `"orc"` or `None` for formats which can't be read
+        directly."""
+        key = (
+            feature_group.feature_store_name,
+            feature_group.name,
+            feature_group.version,
+            feature_group.id,
+        )
+        if key not in self._file_formats:
+            with self._hive_connection_pool.connection(
+                feature_group.feature_store_name
+            ) as hive_conn:
+                cursor = hive_conn.cursor()
+                try:
+                    cursor.execute(
+                        "DESCRIBE FORMATTED `{}_{}`".format(
+                            feature_group.name, feature_group.version
+                        )
+                    )
+                    rows = cursor.fetchall()
+                finally:
+                    cursor.close()
+            input_format = next(
+                (
+                    str(row[1]).lower()
+                    for row in rows
+                    if row[0] is not None and row[0].strip() == "InputFormat:"
+                ),
+                "",
+            )
+            if "parquet" in input_format:
+                self._file_formats[key] = "parquet"
+            elif "orc" in input_format:
+                self._file_formats[key] = "orc"
+            else:
+                self._file_formats[key] = None
+        return self._file_formats[key]
+
     def show(self, sql_query, feature_store, n, online_conn):
-        return self.sql(sql_query, feature_store, online_conn, "default").head(n)
+        return self.head(sql_query, feature_store, n, online_conn, "default")
+
+    def head(
+        self, sql_query, feature_store, n, online_conn, dataframe_type, read_options={}
+    ):
+        # push the limit into the query, so only n rows are transferred to the client
+        return self.sql(
+            util_sql.limit_query(sql_query, n),
+            feature_store,
+            online_conn,
+            dataframe_type,
+            read_options=read_options,
+        )
 
     def register_temporary_table(self, query, storage_connector, alias):
         raise NotImplementedError
@@ -68,6 +346,17 @@ class Engine:
     def set_job_group(self, group_id, description):
         pass
 
+    def persist(self, dataframe, storage_level, reads):
+        # pandas dataframes are materialized already
+        return False
+
+    def unpersist(self, dataframe):
+        pass
+
+    def close(self):
+        self._hive_connection_pool.close()
+        util_sql.dispose_mysql_engines()
+
     def _create_hive_connection(self, feature_store):
         return hive.Connection(
             host=self._host,
@@ -81,21 +370,21 @@ class Engine:
         )
 
     def _create_mysql_connection(self, online_conn):
-        online_options = online_conn.spark_options()
-        # Here we are replacing the first part of the string returned by Hopsworks,
-        # jdbc:mysql:// with the sqlalchemy one + username and password
-        sql_alchemy_conn_str = online_options["url"].replace(
-            "jdbc:mysql://",
-            "mysql+pymysql://"
-            + online_options["user"]
-            + ":"
-            + online_options["password"]
-            + "@",
-        )
-        sql_alchemy_engine = create_engine(sql_alchemy_conn_str, pool_recycle=3600)
-        return sql_alchemy_engine.connect()
+        return util_sql.get_mysql_engine(
+            online_conn,
+            pool_size=self._mysql_pool_size,
+            max_overflow=self._mysql_max_overflow,
+            pool_pre_ping=self._mysql_pool_pre_ping,
+        ).connect()
 
     def _return_dataframe_type(self, dataframe, dataframe_type):
+        if dataframe_type.lower() == "pyarrow" and pyarrow is not None:
+            if isinstance(dataframe, pd.DataFrame):
+                return pyarrow.Table.from_pandas(dataframe, preserve_index=False)
+            return dataframe
+        if not isinstance(dataframe, pd.DataFrame):
+            # Arrow table or record batch
+            dataframe = dataframe.to_pandas()
         if dataframe_type.lower() in ["default", "pandas"]:
             return dataframe
         if dataframe_type.lower() == "numpy":
@@ -14,48 +14,101 @@
 #   limitations under the License.
 #
 
+import functools
+import json
+import math
 import os
+import threading
+import time
+import uuid
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import unquote
 
 import pandas as pd
 import numpy as np
 
 # in case importing in %%local
 try:
-    from pyspark.sql import SparkSession, DataFrame
+    from pyspark.sql import SparkSession, DataFrame, functions
     from pyspark.rdd import RDD
+    from pyspark import StorageLevel
 except ModuleNotFoundError:
     pass
 
-from hsfs import feature, training_dataset_feature
+# pyarrow is optional, if available it is used to speed up the conversion between
+# Spark and pandas dataframes
+try:
+    import pyarrow
+except ModuleNotFoundError:
+    pyarrow = None
+
+from hsfs import feature, training_dataset_feature, util
 from hsfs.storage_connector import StorageConnector
 from hsfs.client.exceptions import FeatureStoreException
-from hsfs.core import hudi_engine
+from hsfs.core import hudi_engine, online_writer, util_sql
 
 
 class Engine:
     HIVE_FORMAT = "hive"
     JDBC_FORMAT = "jdbc"
+    ARROW_MAX_RECORDS_PER_BATCH = 10000
+    DEFAULT_BATCH_SIZE = 10000
+    BATCH_DATAFRAME_TYPES = ["pandas_batches", "numpy_batches", "python_batches"]
+    # defaults of the online write options `batchsize` and `retries`
+    ONLINE_BATCH_SIZE = 1000
+    ONLINE_WRITE_RETRIES = 3
+    DEFAULT_STORAGE_LEVEL = "MEMORY_AND_DISK"
+    # values of the write option `dual_write_failure_mode`
+    FAIL_BOTH = "fail_both"
+    BEST_EFFORT_ONLINE = "best_effort_online"
+    # column holding the split of a row in hash based training dataset splits
+    SPLIT_COLUMN = "hsfs_split"
+    # number of buckets rows are hashed into, the resolution of the split weights
+    SPLIT_BUCKETS = 1000000
+    # target size of compacted training dataset files, in bytes
+    DEFAULT_TARGET_FILE_SIZE = 128 * 1024 * 1024
 
     def __init__(self):
         self._spark_session = SparkSession.builder.getOrCreate()
         self._spark_context = self._spark_session.sparkContext
         self._jvm = self._spark_context._jvm
+        # alias -> key of the temporary view registered under the alias, to skip
+        # registering identical views again
+        self._temporary_tables = {}
+        self._temporary_tables_lock = threading.Lock()
+        # modules which are known to be importable on the executors
+        self._executor_modules = set()
 
         self._spark_session.conf.set("hive.exec.dynamic.partition", "true")
         self._spark_session.conf.set("hive.exec.dynamic.partition.mode", "nonstrict")
         self._spark_session.conf.set("spark.sql.hive.convertMetastoreParquet", "false")
 
+        self._setup_arrow()
+
         if not os.path.exists("/dbfs/"):
             # If we are on Databricks don't setup Pydoop as it's not available and cannot be easily installed.
             self._setup_pydoop()
 
-    def sql(self, sql_query, feature_store, connector, dataframe_type):
+    def sql(
+        self,
+        sql_query,
+        feature_store,
+        connector,
+        dataframe_type,
+        batch_size=None,
+        read_options={},
+    ):
         if not connector:
             result_df = self._sql_offline(sql_query, feature_store)
         else:
             result_df = self._jdbc(sql_query, connector)
 
         self.set_job_group("", "")
+        if dataframe_type.lower() in self.BATCH_DATAFRAME_TYPES:
+            return self._iter_batches(
+                result_df, dataframe_type, batch_size or self.DEFAULT_BATCH_SIZE
+            )
         return self._return_dataframe_type(result_df, dataframe_type)
 
     def _sql_offline(self, sql_query, feature_store):
@@ -71,23 +124,96 @@ class Engine:
             self._spark_session.read.format(self.JDBC_FORMAT).options(**options).load()
         )
 
+    def read_feature_group_files(
+        self,
+        feature_group,
+        features,
+        dataframe_type,
+        filter_conjuncts=[],
+        read_options={},
+    ):
+        # Spark reads the files of the feature group through the metastore already
+        return None
+
     def show(self, sql_query, feature_store, n, online_conn):
         return self.sql(sql_query, feature_store, online_conn, "default").show(n)
 
+    def head(
+        self, sql_query, feature_store, n, online_conn, dataframe_type, read_options={}
+    ):
+        if online_conn:
+            # older Spark versions don't push limits down to JDBC sources
+            sql_query = util_sql.limit_query(sql_query, n)
+        return self._return_dataframe_type(
+            self.sql(sql_query, feature_store, online_conn, "default").limit(n),
+            dataframe_type,
+        )
+
     def set_job_group(self, group_id, description):
         self._spark_session.sparkContext.setJobGroup(group_id, description)
 
+    def persist(self, dataframe, storage_level, reads):
+        """Persist a dataframe which is read `reads` times, so that its lineage is
+        computed once instead of for every read. The first read materializes it.
+
+        :param storage_level: name of the Spark storage level, e.g.
+            `"MEMORY_AND_DISK"`, `"NONE"` to not persist the dataframe, defaults to
+            `DEFAULT_STORAGE_LEVEL` if `None`
+        :type storage_level: str
+        :return: whether the dataframe was persisted and has to be unpersisted
+        :rtype: bool
+        """
+        storage_level = (storage_level or self.DEFAULT_STORAGE_LEVEL).upper()
+        if reads < 2 or storage_level == "NONE" or dataframe.is_cached:
+            return False
+        level = getattr(StorageLevel, storage_level, None)
+        if not isinstance(level, StorageLevel):
+            raise FeatureStoreException(
+                "Unknown storage level `{}`.".format(storage_level)
+            )
+
+        dataframe.persist(level)
+        return True
+
+    def unpersist(self, dataframe):
+        dataframe.unpersist()
+
     def register_on_demand_temporary_table(self, query, storage_connector, alias):
+        table_key = ("on_demand", query, storage_connector.id)
+        if self._is_temporary_table_registered(alias, table_key):
+            return
+
         on_demand_dataset = self._jdbc(query, storage_connector)
         on_demand_dataset.createOrReplaceTempView(alias)
+        self._set_temporary_table_registered(alias, table_key)
 
     def register_hudi_temporary_table(
         self, hudi_fg_alias, feature_store_id, feature_store_name, read_options
     ):
-        hudi_engine_instance = hudi_engine.HudiEngine(
+        feature_group = hudi_fg_alias.feature_group
+        last_commit = hudi_engine.HudiEngine.get_last_commit_timestamp(
+            self._spark_context, feature_group.location
+        )
+        table_key = (
+            "hudi",
+            feature_group.id,
+            feature_group.version,
+            hudi_fg_alias.left_feature_group_start_timestamp,
+            hudi_fg_alias.left_feature_group_end_timestamp,
+            json.dumps(read_options, sort_keys=True, default=str),
+            # a new commit changes the key, so the view is registered again
+            last_commit,
+        )
+        # without the last commit, it is unknown whether the view is up to date
+        if last_commit is not None and self._is_temporary_table_registered(
+            hudi_fg_alias.alias, table_key
+        ):
+            return
+
+        hudi_engine_instance = hudi_engine.get_instance(
             feature_store_id,
             feature_store_name,
-            hudi_fg_alias.feature_group,
+            feature_group,
             self._spark_context,
             self._spark_session,
         )
@@ -97,6 +223,19 @@ class Engine:
             hudi_fg_alias.left_feature_group_end_timestamp,
             read_options,
         )
+        self._set_temporary_table_registered(hudi_fg_alias.alias, table_key)
+
+    def _is_temporary_table_registered(self, alias, table_key):
+        """Whether a view for `table_key` is registered under `alias` and still
+        exists in the session."""
+        with self._temporary_tables_lock:
+            if self._temporary_tables.get(alias) != table_key:
+                return False
+        return self._spark_session._jsparkSession.catalog().tableExists(alias)
+
+    def _set_temporary_table_registered(self, alias, table_key):
+        with self._temporary_tables_lock:
+            self._temporary_tables[alias] = table_key
 
     def _return_dataframe_type(self, dataframe, dataframe_type):
         if dataframe_type.lower() in ["default", "spark"]:
@@ -112,23 +251,59 @@ class Engine:
             "Dataframe type `{}` not supported on this platform.".format(dataframe_type)
         )
 
-    def convert_to_default_dataframe(self, dataframe):
+    def _iter_batches(self, dataframe, dataframe_type, batch_size):
+        """Stream the dataframe to the driver one partition at a time and yield it
+        in batches of `batch_size` rows, so only a single partition and batch are
+        held in driver memory."""
+        batch_type = dataframe_type.lower()[: -len("_batches")]
+        columns = dataframe.columns
+        batch = []
+        for row in dataframe.toLocalIterator():
+            batch.append(row)
+            if len(batch) == batch_size:
+                yield self._convert_batch(batch, columns, batch_type)
+                batch = []
+        if batch:
+            yield self._convert_batch(batch, columns, batch_type)
+
+    @staticmethod
+    def _convert_batch(rows, columns, batch_type):
+        if batch_type == "python":
+            return [list(row) for row in rows]
+        pandas_df = pd.DataFrame.from_records(rows, columns=columns)
+        if batch_type == "numpy":
+            return pandas_df.values
+        return pandas_df
+
+    def convert_to_default_dataframe(self, dataframe, column_names=None):
         if isinstance(dataframe, pd.DataFrame):
             return self._spark_session.createDataFrame(dataframe)
         if isinstance(dataframe, list):
             dataframe = np.array(dataframe)
         if isinstance(dataframe, np.ndarray):
+            if dataframe.dtype.names is not None and dataframe.ndim == 1:
+                # structured arrays carry column names and a dtype per column
+                pandas_df = pd.DataFrame(dataframe)
+                if column_names is not None:
+                    pandas_df.columns = self._validate_column_names(
+                        column_names, len(dataframe.dtype.names)
+                    )
+                return self._spark_session.createDataFrame(pandas_df)
             if dataframe.ndim != 2:
                 raise TypeError(
                     "Cannot convert numpy array that do not have two dimensions to a dataframe. "
                     "The number of dimensions are: {}".format(dataframe.ndim)
                 )
             num_cols = dataframe.shape[1]
-            dataframe_dict = {}
-            for n_col in list(range(num_cols)):
-                col_name = "col_" + str(n_col)
-                dataframe_dict[col_name] = dataframe[:, n_col]
-            pandas_df = pd.DataFrame(dataframe_dict)
+            if column_names is None:
+                column_names = ["col_" + str(n_col) for n_col in range(num_cols)]
+            # avoids slicing the array into a list per column, the data is still
+            # copied into Arrow record batches and by Spark while being transferred
+            pandas_df = pd.DataFrame(
+                dataframe,
+                columns=self._validate_column_names(column_names, num_cols),
+                copy=False,
+            )
             return self._spark_session.createDataFrame(pandas_df)
         if isinstance(dataframe, RDD):
             return dataframe.toDF()
@@ -141,6 +316,15 @@ class Engine:
             )
         )
 
+    @staticmethod
+    def _validate_column_names(column_names, num_cols):
+        if len(column_names) != num_cols:
+            raise ValueError(
+                "The number of column names ({}) does not match the number of columns "
+                "of the provided array ({}).".format(len(column_names), num_cols)
+            )
+        return list(column_names)
+
     def save_dataframe(
         self,
         table_name,
@@ -164,35 +348,171 @@ class Engine:
             )
         elif storage == "online":
             self._save_online_dataframe(
-                table_name, dataframe, save_mode, online_write_options
+                feature_group, dataframe, save_mode, online_write_options
             )
         elif online_enabled and storage is None:
-            self._save_offline_dataframe(
+            self._save_dual_dataframe(
                 table_name,
                 feature_group,
                 dataframe,
                 save_mode,
                 operation,
                 offline_write_options,
-            )
-            self._save_online_dataframe(
-                table_name, dataframe, save_mode, online_write_options
+                online_write_options,
             )
         else:
             raise FeatureStoreException(
                 "Error writing to offline and online feature store."
             )
 
+    def _save_dual_dataframe(
+        self,
+        table_name,
+        feature_group,
+        dataframe,
+        save_mode,
+        operation,
+        offline_write_options,
+        online_write_options,
+    ):
+        """Write the dataframe to the offline and online feature store concurrently.
+
+        The write option `dual_write_failure_mode` defines what happens when a write
+        fails: with `"fail_both"`, the default, an exception is raised once both
+        writes finished, with `"best_effort_online"` a failed online write only
+        issues a warning. The offline write is never cancelled, to not leave a
+        partial HUDI commit behind. A failed offline write cancels the online write
+        if PySpark pins Python threads to JVM threads, which makes the Spark job
+        groups of the writes thread local. Rows upserted before an online write was
+        cancelled remain in the online feature store.
+
+        The dataframe should be persisted, otherwise both writes compute it.
+        """
+        failure_mode = online_write_options.get(
+            "dual_write_failure_mode", self.FAIL_BOTH
+        ).lower()
+        if failure_mode not in [self.FAIL_BOTH, self.BEST_EFFORT_ONLINE]:
+            raise FeatureStoreException(
+                "Unknown dual write failure mode `{}`, use `{}` or `{}`.".format(
+                    failure_mode, self.FAIL_BOTH, self.BEST_EFFORT_ONLINE
+                )
+            )
+        offline_write_options = {
+            key: value
+            for key, value in offline_write_options.items()
+            if key != "dual_write_failure_mode"
+        }
+        online_write_options = {
+            key: value
+            for key, value in online_write_options.items()
+            if key != "dual_write_failure_mode"
+        }
+
+        # without pinned threads, job groups would be set for all threads at once
+        job_group = (
+            "hsfs_{}_{}".format(table_name, uuid.uuid4().hex[:8])
+            if self._threads_pinned()
+            else None
+        )
+        sinks = {
+            "offline": lambda: self._save_offline_dataframe(
+                table_name,
+                feature_group,
+                dataframe,
+                save_mode,
+                operation,
+                offline_write_options,
+            ),
+            "online": lambda: self._save_online_dataframe(
+                feature_group, dataframe, save_mode, online_write_options
+            ),
+        }
+        durations = {}
+
+        def run(sink):
+            if job_group is not None:
+                self.set_job_group(
+                    "{}_{}".format(job_group, sink),
+                    "Write {} to the {} feature store".format(table_name, sink),
+                )
+            start = time.time()
+            try:
+                sinks[sink]()
+            finally:
+                durations[sink] = time.time() - start
+                if job_group is not None:
+                    self.set_job_group("", "")
+
+        start = time.time()
+        errors = self._run_sinks_concurrently(sinks, run, job_group)
+
+        print(
+            "Wrote `{}` in {:.1f}s, {}.".format(
+                table_name,
+                time.time() - start,
+                ", ".join(
+                    "{} feature store {:.1f}s{}".format(
+                        sink, durations[sink], " (failed)" if sink in errors else ""
+                    )
+                    for sink in sinks
+                ),
+            )
+        )
+
+        if list(errors) == ["online"] and failure_mode == self.BEST_EFFORT_ONLINE:
+            warnings.warn(
+                "Writing `{}` to the online feature store failed, the offline feature "
+                "store was written: {}".format(table_name, errors["online"]),
+                util.StorageWarning,
+            )
+        elif errors:
+            raise FeatureStoreException(
+                "Failed to write `{}` to the {} feature store:\n{}".format(
+                    table_name,
+                    " and ".join(errors),
+                    "\n".join(
+                        "  {}: {}".format(sink, error) for sink, error in errors.items()
+                    ),
+                )
+            ) from next(iter(errors.values()))
+
+    def _run_sinks_concurrently(self, sinks, run, job_group):
+        """Run the writes of `sinks` in parallel threads and wait for all of them,
+        return the errors of the failed writes by sink.
+
+        A failed offline write cancels the online write if `job_group` is set.
+        """
+        with ThreadPoolExecutor(
+            max_workers=len(sinks), thread_name_prefix="hsfs-write"
+        ) as executor:
+            futures = {sink: executor.submit(run, sink) for sink in sinks}
+            if futures["offline"].exception() is not None and job_group is not None:
+                self._spark_context.cancelJobGroup("{}_online".format(job_group))
+        return {
+            sink: future.exception()
+            for sink, future in futures.items()
+            if future.exception() is not None
+        }
+
+    def _threads_pinned(self):
+        """Whether every Python thread has its own JVM thread, which makes job
+        groups thread local. This is the default since PySpark 3.2."""
+        try:
+            from py4j.clientserver import ClientServer
+        except ImportError:
+            return False
+        return isinstance(self._spark_context._gateway, ClientServer)
+
     def _save_offline_dataframe(
         self, table_name, feature_group, dataframe, save_mode, operation, write_options,
     ):
         if feature_group.time_travel_format == "HUDI":
-            hudi_engine_instance = hudi_engine.HudiEngine(
+            hudi_engine_instance = hudi_engine.get_instance(
                 feature_group.feature_store_id,
                 feature_group.feature_store_name,
                 feature_group,
-                self._spark_session,
                 self._spark_context,
+                self._spark_session,
             )
             hudi_engine_instance.save_hudi_fg(
                 dataframe, save_mode, operation, write_options
@@ -206,10 +526,92 @@ class Engine:
                 table_name
             )
 
-    def _save_online_dataframe(self, table_name, dataframe, save_mode, write_options):
-        dataframe.write.format(self.JDBC_FORMAT).mode(save_mode).options(
-            **write_options
-        ).save()
+    def _save_online_dataframe(
+        self, feature_group, dataframe, save_mode, write_options
+    ):
+        """Write the dataframe into the online table of the feature group.
+
+        By default, the rows are written with the JDBC writer of Spark. With the
+        write option `online_upsert` set to `"true"`, rows with the primary key of
+        an existing row replace it instead. Upserts are sent by hsfs from the
+        executors, which requires the `hsfs` and `pymysql` packages to be installed
+        on them.
+
+        The JDBC write options `batchsize` and `numPartitions` set the number of
+        rows per statement and the maximum number of partitions written
+        concurrently, `retries` the number of times a failed upsert batch is
+        retried.
+        """
+        write_options = dict(write_options)
+        upsert = str(write_options.pop("online_upsert", "false")).lower() == "true"
+        retries = int(write_options.pop("retries", self.ONLINE_WRITE_RETRIES))
+        if not upsert:
+            dataframe.write.format(self.JDBC_FORMAT).mode(save_mode).options(
+                **write_options
+            ).save()
+            return
+
+        self._check_executor_modules(["hsfs", "pymysql"])
+        batch_size = int(write_options.get("batchsize", self.ONLINE_BATCH_SIZE))
+        num_partitions = int(write_options.get("numPartitions", 0))
+        if 0 < num_partitions < dataframe.rdd.getNumPartitions():
+            dataframe = dataframe.coalesce(num_partitions)
+
+        table_name = write_options["dbtable"]
+        connection_options = util_sql.get_mysql_connection_options(write_options)
+        sql = online_writer.upsert_sql(
+            table_name, dataframe.columns, feature_group.primary_key
+        )
+        rows_written = self._spark_context.accumulator(0)
+        start = time.time()
+        dataframe.foreachPartition(
+            functools.partial(
+                online_writer.write_partition,
+                connection_options=connection_options,
+                sql=sql,
+                batch_size=batch_size,
+                retries=retries,
+                rows_written=rows_written,
+            )
+        )
+        duration = time.time() - start
+        print(
+            "Wrote {} rows to online table `{}` in {:.1f}s ({:.0f} rows/s).".format(
+                rows_written.value,
+                table_name,
+                duration,
+                rows_written.value / duration if duration > 0 else 0,
+            )
+        )
+
+    def _check_executor_modules(self, modules):
+        """Raise an exception if `modules` can't be imported on the executors.
+
+        The modules are looked up on the executor running a single task, they are
+        expected to be installed on all executors alike.
+        """
+        if self._executor_modules.issuperset(modules):
+            return
+
+        def find_missing(_):
+            import importlib.util
+
+            return [
+                module for module in modules if importlib.util.find_spec(module) is None
+            ]
+
+        missing = (
+            self._spark_context.parallelize([0], 1).flatMap(find_missing).collect()
+        )
+        if missing:
+            raise FeatureStoreException(
+                "Upserts into the online feature store run on the Spark executors, "
+                "which are missing the packages: {}. Install them on the executors "
+                "or write without the option `online_upsert`.".format(
+                    ", ".join(missing)
+                )
+            )
+        self._executor_modules.update(modules)
 
     def write(
         self, dataframe, storage_connector, data_format, write_mode, write_options, path
@@ -220,10 +622,333 @@ class Engine:
         if storage_connector.connector_type == StorageConnector.S3:
             path = self._setup_s3(storage_connector, path)
 
+        write_options = dict(write_options)
+        dataframe = self._size_output_files(dataframe, write_options)
         dataframe.write.format(data_format).options(**write_options).mode(
             write_mode
         ).save(path)
 
+    def compact(
+        self, storage_connector, data_format, read_options, write_options, path
+    ):
+        """Rewrite the files in `path` as files of the size given by the write options
+        `rows_per_file` or `target_file_size`, defaulting to a target file size of
+        `DEFAULT_TARGET_FILE_SIZE` bytes.
+
+        The compacted files are written next to `path` and replace it once they are
+        complete.
+        """
+        if data_format.lower() in ["csv", "tsv"]:
+            # keep the values as they are written
+            read_options = {**read_options, "inferSchema": "false"}
+        write_options = dict(write_options)
+        if not write_options.get("rows_per_file"):
+            write_options.setdefault("target_file_size", self.DEFAULT_TARGET_FILE_SIZE)
+
+        dataframe = self.read(storage_connector, data_format, read_options, path)
+        if storage_connector.connector_type == StorageConnector.S3:
+            path = self._setup_s3(storage_connector, path)
+        source_path = self._jvm.org.apache.hadoop.fs.Path(path)
+        filesystem = source_path.getFileSystem(
+            self._spark_context._jsc.hadoopConfiguration()
+        )
+        num_source_files = len(
+            [
+                status
+                for status in filesystem.listStatus(source_path)
+                if status.isFile() and not status.getPath().getName().startswith("_")
+            ]
+        )
+        compacted_path = self._jvm.org.apache.hadoop.fs.Path(
+            path.rstrip("/") + "_compacted"
+        )
+        backup_path = self._jvm.org.apache.hadoop.fs.Path(path.rstrip("/") + "_backup")
+
+        dataframe = self._size_output_files(
+            dataframe,
+            write_options,
+            filesystem.getContentSummary(source_path).getLength(),
+            # the files are read once more for the count, which is cheap compared
+            # to the rewrite and needed to merge them by number of rows
+            dataframe.count() if write_options.get("rows_per_file") else None,
+        )
+        num_files = dataframe.rdd.getNumPartitions()
+        if data_format.lower() == "tsv":
+            data_format = "csv"
+        dataframe.write.format(data_format).options(**write_options).mode(
+            "overwrite"
+        ).save(compacted_path.toString())
+
+        if not filesystem.rename(source_path, backup_path):
+            raise FeatureStoreException("Failed to move `{}`.".format(path))
+        if not filesystem.rename(compacted_path, source_path):
+            filesystem.rename(backup_path, source_path)
+            raise FeatureStoreException(
+                "Failed to replace `{}` with its compacted files.".format(path)
+            )
+        filesystem.delete(backup_path, True)
+        print(
+            "Compacted `{}` from {} to at most {} files.".format(
+                path, num_source_files, num_files
+            )
+        )
+
+    def _size_output_files(
+        self, dataframe, write_options, size_in_bytes=None, num_rows=None
+    ):
+        """Repartition a dataframe before writing it, according to the write options
+        `rows_per_file` and `target_file_size`, the number of bytes per file.
+
+        The options are removed from `write_options`. With `rows_per_file`, Spark's
+        `maxRecordsPerFile` caps the files, and the number of files is derived from
+        `num_rows` if known. Persisted dataframes are counted, others are not, as
+        counting would evaluate them once more before the write.
+        The size of the written data is estimated with the statistics of the query
+        plan, unless `size_in_bytes` is known. The number of partitions is reduced
+        with a coalesce, avoiding a shuffle, and increased with a repartition.
+        """
+        num_files = self._num_output_files(
+            dataframe, write_options, size_in_bytes, num_rows
+        )
+        if num_files is None:
+            return dataframe
+        return self._repartition(dataframe, num_files)
+
+    def _num_output_files(
+        self, dataframe, write_options, size_in_bytes=None, num_rows=None
+    ):
+        """Get the number of files to write a dataframe to, according to the write
+        options, or `None` if they don't set the size of the files. See
+        `_size_output_files`."""
+        rows_per_file = int(write_options.pop("rows_per_file", 0) or 0)
+        target_file_size = int(write_options.pop("target_file_size", 0) or 0)
+
+        num_files = []
+        if rows_per_file > 0:
+            write_options["maxRecordsPerFile"] = rows_per_file
+            if num_rows is None and dataframe.is_cached:
+                num_rows = dataframe.count()
+            if num_rows is not None:
+                num_files.append(math.ceil(num_rows / rows_per_file))
+        if target_file_size > 0:
+            if size_in_bytes is None:
+                size_in_bytes = self._estimate_size(dataframe)
+            if size_in_bytes is not None:
+                num_files.append(math.ceil(size_in_bytes / target_file_size))
+        if not num_files:
+            return None
+        return max(max(num_files), 1)
+
+    @staticmethod
+    def _repartition(dataframe, num_partitions):
+        current_partitions = dataframe.rdd.getNumPartitions()
+        if num_partitions < current_partitions:
+            return dataframe.coalesce(num_partitions)
+        elif num_partitions > current_partitions:
+            return dataframe.repartition(num_partitions)
+        return dataframe
+
+    @staticmethod
+    def _estimate_size(dataframe):
+        """Get Spark's estimate of the size of a dataframe in bytes, or `None` if the
+        size is unknown."""
+        try:
+            size_in_bytes = int(
+                dataframe._jdf.queryExecution()
+                .optimizedPlan()
+                .stats()
+                .sizeInBytes()
+                .toString()
+            )
+        except Exception:
+            return None
+        # Spark assumes spark.sql.defaultSizeInBytes, Long.MaxValue by default, for
+        # relations without statistics
+        return size_in_bytes if size_in_bytes < 2 ** 63 - 1 else None
+
+    def write_hash_splits(
+        self,
+        dataframe,
+        storage_connector,
+        data_format,
+        write_mode,
+        write_options,
+        path,
+        splits,
+        seed,
+        keys,
+    ):
+        """Write the splits of a training dataset in a single pass over the dataframe.
+
+        Rows are assigned to a split by hashing the `keys` columns together with the
+        seed, so that a row stays in the same split when the training dataset is
+        recreated. Like splits written separately, every split is written to
+        `path/<split name>`. The files sized by the write options are divided among
+        the splits according to their weights.
+
+        :param splits: weights by split name
+        :type splits: dict
+        :param seed: seed of the hash, defaults to 0 if `None`
+        :type seed: int
+        :param keys: columns identifying a row, list or comma separated string
+        :type keys: list
+        """
+        if isinstance(keys, str):
+            keys = [key.strip() for key in keys.split(",") if key.strip()]
+        if not keys:
+            raise FeatureStoreException(
+                "Hash based splits require the columns identifying a row."
+            )
+        missing_keys = [key for key in keys if key not in dataframe.columns]
+        if missing_keys:
+            raise FeatureStoreException(
+                "Split keys `{}` are not columns of the training dataset.".format(
+                    "`, `".join(missing_keys)
+                )
+            )
+
+        split_names = sorted(splits)
+        total_weight = sum(splits.values())
+        # the hash can be negative, functions.pmod is not available before Spark 3.4
+        bucket = (
+            functions.hash(
+                functions.lit(seed if seed is not None else 0),
+                *[functions.col(key) for key in keys]
+            )
+            % self.SPLIT_BUCKETS
+            + self.SPLIT_BUCKETS
+        ) % self.SPLIT_BUCKETS
+        split = None
+        cumulative_weight = 0
+        for split_name in split_names[:-1]:
+            cumulative_weight += splits[split_name]
+            in_split = bucket < int(
+                round(cumulative_weight / total_weight * self.SPLIT_BUCKETS)
+            )
+            split = (
+                functions.when(in_split, split_name)
+                if split is None
+                else split.when(in_split, split_name)
+            )
+        split = (
+            functions.lit(split_names[-1])
+            if split is None
+            else split.otherwise(split_names[-1])
+        )
+        dataframe = dataframe.withColumn(self.SPLIT_COLUMN, split)
+        write_options = dict(write_options)
+
+        if data_format.lower() == "tsv":
+            data_format = "csv"
+
+        if storage_connector.connector_type == StorageConnector.S3:
+            path = self._setup_s3(storage_connector, path)
+
+        if data_format.lower() == "tfrecords":
+            # the TensorFlow connector doesn't support partitioned writes, write the
+            # splits one by one from the persisted labelled rows instead
+            persisted = self.persist(dataframe, None, len(split_names))
+            try:
+                split_files = self._split_output_files(dataframe, write_options, splits)
+                for split_name in split_names:
+                    split_dataframe = dataframe.filter(
+                        functions.col(self.SPLIT_COLUMN) == split_name
+                    ).drop(self.SPLIT_COLUMN)
+                    if split_files is not None:
+                        split_dataframe = self._repartition(
+                            split_dataframe, split_files[split_name]
+                        )
+                    split_dataframe.write.format(data_format).options(
+                        **write_options
+                    ).mode(write_mode).save(path + "/" + split_name)
+            finally:
+                if persisted:
+                    self.unpersist(dataframe)
+        else:
+            split_files = self._split_output_files(dataframe, write_options, splits)
+            if split_files is not None:
+                # every task writes one file per split it holds rows of, cluster
+                # the rows of a split into as many partitions as it has files
+                file_index = None
+                for split_name in split_names:
+                    in_split = functions.col(self.SPLIT_COLUMN) == split_name
+                    index = bucket % split_files[split_name]
+                    file_index = (
+                        functions.when(in_split, index)
+                        if file_index is None
+                        else file_index.when(in_split, index)
+                    )
+                dataframe = dataframe.repartition(
+                    sum(split_files.values()), self.SPLIT_COLUMN, file_index
+                )
+            dataframe.write.format(data_format).options(**write_options).mode(
+                write_mode
+            ).partitionBy(self.SPLIT_COLUMN).save(path)
+            self._move_split_directories(path, split_names, write_mode)
+
+    def _split_output_files(self, dataframe, write_options, splits):
+        """Get the number of files of every split, dividing the files sized by the
+        write options according to the weights of the splits, or `None` if the
+        write options don't set the size of the files."""
+        num_files = self._num_output_files(dataframe, write_options)
+        if num_files is None:
+            return None
+        total_weight = sum(splits.values())
+        return {
+            split_name: max(math.ceil(num_files * weight / total_weight), 1)
+            for split_name, weight in splits.items()
+        }
+
+    def _move_split_directories(self, path, split_names, write_mode):
+        """Move the partitions `path/hsfs_split=<split name>` of a partitioned write
+        to `path/<split name>`.
+
+        Appended files are moved into existing split directories, which are
+        replaced when overwriting.
+        """
+        base_path = self._jvm.org.apache.hadoop.fs.Path(path)
+        filesystem = base_path.getFileSystem(
+            self._spark_context._jsc.hadoopConfiguration()
+        )
+        partition_prefix = self.SPLIT_COLUMN + "="
+
+        def rename(source, target):
+            if not filesystem.rename(source, target):
+                raise FeatureStoreException(
+                    "Failed to move `{}` to `{}`.".format(
+                        source.toString(), target.toString()
+                    )
+                )
+
+        for status in filesystem.listStatus(base_path):
+            partition_path = status.getPath()
+            if not status.isDirectory() or not partition_path.getName().startswith(
+                partition_prefix
+            ):
+                continue
+            split_path = self._jvm.org.apache.hadoop.fs.Path(
+                base_path, unquote(partition_path.getName()[len(partition_prefix) :])
+            )
+            if filesystem.exists(split_path) and write_mode.lower() == "overwrite":
+                filesystem.delete(split_path, True)
+            if filesystem.exists(split_path):
+                for file_status in filesystem.listStatus(partition_path):
+                    rename(
+                        file_status.getPath(),
+                        self._jvm.org.apache.hadoop.fs.Path(
+                            split_path, file_status.getPath().getName()
+                        ),
+                    )
+                filesystem.delete(partition_path, True)
+            else:
+                rename(partition_path, split_path)
+
+        # splits without rows are written as empty directories by separate writes
+        for split_name in split_names:
+            split_path = self._jvm.org.apache.hadoop.fs.Path(base_path, split_name)
+            if not filesystem.exists(split_path):
+                filesystem.mkdirs(split_path)
+
     def read(self, storage_connector, data_format, read_options, path):
 
         if data_format.lower() == "tsv":
@@ -349,6 +1074,44 @@ class Engine:
             )
         return path.replace("s3", "s3a", 1)
 
+    def _setup_arrow(self):
+        """Enable Arrow based conversion between Spark and pandas dataframes.
+
+        Arrow is only enabled if pyarrow is available, settings which were already
+        explicitly configured on the Spark session are left untouched. Conversions
+        which are not supported by Arrow, e.g. nested types, fall back to the
+        non-Arrow code path.
+
+        Spark 2 reads and writes the Arrow IPC format of pyarrow < 0.15. Newer
+        pyarrow versions are switched to the legacy format, which pyarrow >= 2
+        doesn't support anymore, Arrow stays disabled in that case.
+        """
+        if pyarrow is None:
+            return
+
+        if int(self._spark_session.version.split(".")[0]) < 3:
+            pyarrow_version = tuple(
+                int(part) for part in pyarrow.__version__.split(".")[:2]
+            )
+            if pyarrow_version >= (2, 0):
+                return
+            if pyarrow_version >= (0, 15):
+                os.environ.setdefault("ARROW_PRE_0_15_IPC_FORMAT", "1")
+            arrow_prefix = "spark.sql.execution.arrow."
+        else:
+            arrow_prefix = "spark.sql.execution.arrow.pyspark."
+
+        arrow_conf = {
+            arrow_prefix + "enabled": "true",
+            arrow_prefix + "fallback.enabled": "true",
+            "spark.sql.execution.arrow.maxRecordsPerBatch": str(
+                self.ARROW_MAX_RECORDS_PER_BATCH
+            ),
+        }
+        for key, value in arrow_conf.items():
+            if self._spark_session.conf.get(key, None) is None:
+                self._spark_session.conf.set(key, value)
+
     def _setup_pydoop(self):
         # Import Pydoop only here, so it doesn't trigger if the execution environment
         # does not support Pydoop. E.g. Sagemaker
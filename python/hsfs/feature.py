@@ -16,6 +16,8 @@
 
 import humps
 
+from hsfs.core import filter
+
 
 class Feature:
     """Metadata object representing a feature in a feature group in the Feature Store.
@@ -33,6 +35,7 @@ class Feature:
         partition=None,
         online_type=None,
         default_value=None,
+        feature_group_id=None,
     ):
         self._name = name
         self._type = type
@@ -41,6 +44,8 @@ class Feature:
         self._partition = partition or False
         self._online_type = online_type
         self._default_value = default_value
+        # not serialized, used to resolve the feature group of filters in joins
+        self._feature_group_id = feature_group_id
 
     def to_dict(self):
         return {
@@ -109,3 +114,43 @@ class Feature:
     @default_value.setter
     def default_value(self, default_value):
         self._default_value = default_value
+
+    @property
+    def feature_group_id(self):
+        """Id of the feature group the feature belongs to, if known."""
+        return self._feature_group_id
+
+    @feature_group_id.setter
+    def feature_group_id(self, feature_group_id):
+        self._feature_group_id = feature_group_id
+
+    def isin(self, other):
+        """Create a filter requiring the feature to be one of the values in `other`."""
+        return filter.Filter(self, filter.Filter.IN, list(other))
+
+    def like(self, other):
+        """Create a filter requiring the feature to match the SQL `LIKE` pattern
+        `other`."""
+        return filter.Filter(self, filter.Filter.LK, other)
+
+    def eq(self, other):
+        """Create a filter requiring the feature to be equal to `other`, or to be
+        `NULL` if `other` is `None`."""
+        return filter.Filter(self, filter.Filter.EQ, other)
+
+    def ne(self, other):
+        """Create a filter requiring the feature to differ from `other`, or not to
+        be `NULL` if `other` is `None`."""
+        return filter.Filter(self, filter.Filter.NE, other)
+
+    def __lt__(self, other):
+        return filter.Filter(self, filter.Filter.LT, other)
+
+    def __le__(self, other):
+        return filter.Filter(self, filter.Filter.LE, other)
+
+    def __ge__(self, other):
+        return filter.Filter(self, filter.Filter.GE, other)
+
+    def __gt__(self, other):
+        return filter.Filter(self, filter.Filter.GT, other)
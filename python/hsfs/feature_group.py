@@ -22,7 +22,13 @@ import numpy as np
 from typing import Optional, Union, Any, Dict, List, TypeVar
 
 from hsfs import util, engine, feature
-from hsfs.core import query, feature_group_engine, statistics_engine, feature_group_base
+from hsfs.core import (
+    query,
+    feature_group_engine,
+    statistics_engine,
+    feature_group_base,
+    vector_server,
+)
 from hsfs.statistics_config import StatisticsConfig
 
 
@@ -68,6 +74,8 @@ class FeatureGroup(feature_group_base.FeatureGroupBase):
             feature.Feature.from_response_json(feat) if isinstance(feat, dict) else feat
             for feat in features
         ]
+        for feat in self._features:
+            feat.feature_group_id = id
         self._location = location
         self._jobs = jobs
         self._online_enabled = online_enabled
@@ -104,6 +112,8 @@ class FeatureGroup(feature_group_base.FeatureGroupBase):
             featurestore_id, self.ENTITY_TYPE
         )
 
+        self._vector_server = vector_server.VectorServer(featurestore_id)
+
     def read(
         self,
         wallclock_time: Optional[str] = None,
@@ -140,8 +150,16 @@ class FeatureGroup(feature_group_base.FeatureGroupBase):
             online: bool, optional. If `True` read from online feature store, defaults
                 to `False`.
             dataframe_type: str, optional. Possible values are `"default"`, `"spark"`,
-                `"pandas"`, `"numpy"` or `"python"`, defaults to `"default"`.
+                `"pandas"`, `"numpy"` or `"python"`, defaults to `"default"`. To
+                stream the data instead of loading it into memory at once, use
+                `"pandas_batches"`, `"numpy_batches"` or `"python_batches"`.
             read_options: Additional read options as key/value pairs, defaults to `{}`.
+                On Python clients, `"arrow_fetch"` set to `True` decodes query
+                results column-wise with pyarrow, which is faster for large results
+                but returns Arrow types, e.g. dates as dates instead of strings.
+                Feature groups are read directly from their files on Python
+                clients if possible, `"direct_read"` set to `False` reads them
+                through HiveServer2 instead.
 
         # Returns
             `DataFrame`: The spark dataframe containing the feature data.
@@ -149,6 +167,8 @@ class FeatureGroup(feature_group_base.FeatureGroupBase):
             `pandas.DataFrame`. A Pandas DataFrame.
             `numpy.ndarray`. A two-dimensional Numpy array.
             `list`. A two-dimensional Python list.
+            `Iterator`. An iterator over batches of one of the above types, for the
+                streaming dataframe types.
 
         # Raises
             `RestAPIError`. No data is available for feature group with this commit date, If time travel enabled.
@@ -222,6 +242,21 @@ class FeatureGroup(feature_group_base.FeatureGroupBase):
         )
         return self.select_all().show(n, online)
 
+    def get_online_row(self, entry: Dict[str, Any]):
+        """Look up a row of the feature group in the online feature store.
+
+        # Arguments
+            entry: Primary key values of the row, by primary key name.
+
+        # Returns
+            `dict`. Feature values by feature name, values are `None` if the row
+                doesn't exist.
+
+        # Raises
+            `FeatureStoreException`. If a primary key is missing in the entry.
+        """
+        return self._vector_server.get_online_row(self, entry)
+
     def save(
         self,
         features: Union[
@@ -243,12 +278,22 @@ class FeatureGroup(feature_group_base.FeatureGroupBase):
         `online_enabled` for the feature group, also to the online feature store.
 
         The `features` dataframe can be a Spark DataFrame or RDD, a Pandas DataFrame,
-        or a two-dimensional Numpy array or a two-dimensional Python nested list.
+        or a two-dimensional Numpy array or a two-dimensional Python nested list. The
+        columns of Numpy arrays and Python lists are named after the features of the
+        feature group, in order, if its schema is known, and their number must match.
 
         # Arguments
             features: Query, DataFrame, RDD, Ndarray, list. Features to be saved.
             write_options: Additional write options for Spark as
-                key-value pairs, defaults to `{}`.
+                key-value pairs, defaults to `{}`. With `"online_upsert"` set to
+                `"true"`, rows are upserted into the online feature store by
+                primary key, which requires `hsfs` and `pymysql` on the Spark
+                executors. `"batchsize"` (rows per statement), `"numPartitions"`
+                (concurrent writers) and `"retries"` (retries of a failed upsert
+                batch) tune the online write. When the input
+                is read more than once, it is persisted once with the Spark storage
+                level `"storage_level"`, defaults to `"MEMORY_AND_DISK"`, `"NONE"`
+                recomputes the input for every read.
 
         # Returns
             `FeatureGroup`. Returns the persisted `FeatureGroup` metadata object.
@@ -256,12 +301,25 @@ class FeatureGroup(feature_group_base.FeatureGroupBase):
         # Raises
             `RestAPIError`. Unable to create feature group.
         """
-        feature_dataframe = engine.get_instance().convert_to_default_dataframe(features)
+        feature_dataframe = engine.get_instance().convert_to_default_dataframe(
+            features, self._column_names()
+        )
+        write_options = dict(write_options)
+        # the input is read by the offline write, the online write and statistics
+        persisted = engine.get_instance().persist(
+            feature_dataframe,
+            write_options.pop("storage_level", None),
+            1 + int(self.online_enabled) + int(self.statistics_config.enabled),
+        )
 
         user_version = self._version
-        self._feature_group_engine.save(self, feature_dataframe, write_options)
-        if self.statistics_config.enabled:
-            self._statistics_engine.compute_statistics(self, feature_dataframe)
+        try:
+            self._feature_group_engine.save(self, feature_dataframe, write_options)
+            if self.statistics_config.enabled:
+                self._statistics_engine.compute_statistics(self, feature_dataframe)
+        finally:
+            if persisted:
+                engine.get_instance().unpersist(feature_dataframe)
         if user_version is None:
             warnings.warn(
                 "No version provided for creating feature group `{}`, incremented version to `{}`.".format(
@@ -294,7 +352,9 @@ class FeatureGroup(feature_group_base.FeatureGroupBase):
         `storage="offline"`.
 
         The `features` dataframe can be a Spark DataFrame or RDD, a Pandas DataFrame,
-        or a two-dimensional Numpy array or a two-dimensional Python nested list.
+        or a two-dimensional Numpy array or a two-dimensional Python nested list. The
+        columns of Numpy arrays and Python lists are named after the features of the
+        feature group, in order, if its schema is known, and their number must match.
 
         If statistics are enabled, statistics are recomputed for the entire feature
         group.
@@ -320,22 +380,44 @@ class FeatureGroup(feature_group_base.FeatureGroupBase):
                 storage only with `"offline"` or online only with `"online"`, defaults
                 to `None`.
             write_options: Additional write options for Spark as
-                key-value pairs, defaults to `{}`.
+                key-value pairs, defaults to `{}`. With `"online_upsert"` set to
+                `"true"`, rows are upserted into the online feature store by
+                primary key, which requires `hsfs` and `pymysql` on the Spark
+                executors. `"batchsize"` (rows per statement), `"numPartitions"`
+                (concurrent writers) and `"retries"` (retries of a failed upsert
+                batch) tune the online write. When the input
+                is read more than once, it is persisted once with the Spark storage
+                level `"storage_level"`, defaults to `"MEMORY_AND_DISK"`, `"NONE"`
+                recomputes the input for every read.
 
         # Returns
             `FeatureGroup`. Updated feature group metadata object.
         """
-        feature_dataframe = engine.get_instance().convert_to_default_dataframe(features)
-
-        self._feature_group_engine.insert(
-            self,
+        feature_dataframe = engine.get_instance().convert_to_default_dataframe(
+            features, self._column_names()
+        )
+        storage = storage.lower() if storage is not None else None
+        write_options = dict(write_options)
+        # statistics are computed on the feature group, only the writes read the input
+        persisted = engine.get_instance().persist(
             feature_dataframe,
-            overwrite,
-            operation,
-            storage.lower() if storage is not None else None,
-            write_options,
+            write_options.pop("storage_level", None),
+            int(storage != "online") + int(self.online_enabled and storage != "offline"),
         )
 
+        try:
+            self._feature_group_engine.insert(
+                self,
+                feature_dataframe,
+                overwrite,
+                operation,
+                storage,
+                write_options,
+            )
+        finally:
+            if persisted:
+                engine.get_instance().unpersist(feature_dataframe)
+
         self.compute_statistics()
 
     def commit_details(self, limit: Optional[int] = None):
@@ -456,6 +538,10 @@ class FeatureGroup(feature_group_base.FeatureGroupBase):
         self._feature_group_engine.append_features(self, new_features)
         return self
 
+    def _column_names(self):
+        # names for the columns of numpy arrays and python lists, which have none
+        return [feat.name for feat in self._features] or None
+
     @classmethod
     def from_response_json(cls, json_dict):
         json_decamelized = humps.decamelize(json_dict)
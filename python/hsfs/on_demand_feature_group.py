@@ -73,6 +73,8 @@ class OnDemandFeatureGroup(feature_group_base.FeatureGroupBase):
             ]
         else:
             self._features = features
+        for feat in self._features or []:
+            feat.feature_group_id = id
 
         if storage_connector is not None and isinstance(storage_connector, dict):
             self._storage_connector = sc.StorageConnector.from_response_json(
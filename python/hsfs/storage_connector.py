@@ -74,6 +74,11 @@ class StorageConnector:
         """Id of the storage connector uniquely identifying it in the Feature store."""
         return self._id
 
+    @property
+    def name(self):
+        """Name of the storage connector."""
+        return self._name
+
     @property
     def connector_type(self):
         """Type of the connector. S3, JDBC or HOPSFS."""
@@ -32,6 +32,7 @@ from hsfs.core import (
     training_dataset_engine,
     tfdata_engine,
     statistics_engine,
+    vector_server,
 )
 from hsfs.client import exceptions
 
@@ -94,6 +95,8 @@ class TrainingDataset:
             featurestore_id, self.ENTITY_TYPE
         )
 
+        self._vector_server = vector_server.VectorServer(featurestore_id)
+
         # set up depending on user initialized or coming from backend response
         if training_dataset_type is None:
             # no type -> user init
@@ -134,11 +137,21 @@ class TrainingDataset:
         This method materializes the training dataset either from a Feature Store
         `Query`, a Spark or Pandas `DataFrame`, a Spark RDD, two-dimensional Python
         lists or Numpy ndarrays.
+        The columns of Numpy arrays and Python lists are named after the features of
+        the training dataset, in order, if its schema is known, and their number must
+        match.
 
         # Arguments
             features: Feature data to be materialized.
             write_options: Additional write options as key/value pairs.
-                Defaults to `{}`.
+                Defaults to `{}`. With `"split_mode"` set to `"hash"`, rows are
+                assigned to splits by hashing the `"split_keys"` columns, a list
+                or comma separated string of columns identifying a row, and the
+                seed. Splits are then stable across re-creations and written in a
+                single pass.
+                `"rows_per_file"` and `"target_file_size"` (bytes) set the size of
+                the written files, the data is repartitioned accordingly before
+                writing it.
 
         # Returns
             `TrainingDataset`: The updated training dataset metadata object, the
@@ -153,7 +166,7 @@ class TrainingDataset:
             self._querydto = features
         else:
             feature_dataframe = engine.get_instance().convert_to_default_dataframe(
-                features
+                features, self._column_names()
             )
 
         self._features = engine.get_instance().parse_schema_training_dataset(
@@ -196,6 +209,9 @@ class TrainingDataset:
         This method appends data to the training dataset either from a Feature Store
         `Query`, a Spark or Pandas `DataFrame`, a Spark RDD, two-dimensional Python
         lists or Numpy ndarrays. The schemas must match for this operation.
+        The columns of Numpy arrays and Python lists are named after the features of
+        the training dataset, in order, if its schema is known, and their number must
+        match.
 
         This can also be used to overwrite all data in an existing training dataset.
 
@@ -203,7 +219,14 @@ class TrainingDataset:
             features: Feature data to be materialized.
             overwrite: Whether to overwrite the entire data in the training dataset.
             write_options: Additional write options as key/value pairs.
-                Defaults to `{}`.
+                Defaults to `{}`. With `"split_mode"` set to `"hash"`, rows are
+                assigned to splits by hashing the `"split_keys"` columns, a list
+                or comma separated string of columns identifying a row, and the
+                seed. Splits are then stable across re-creations and written in a
+                single pass.
+                `"rows_per_file"` and `"target_file_size"` (bytes) set the size of
+                the written files, the data is repartitioned accordingly before
+                writing it.
 
         # Returns
             `TrainingDataset`: The updated training dataset metadata object, the
@@ -217,7 +240,7 @@ class TrainingDataset:
             feature_dataframe = features.read()
         else:
             feature_dataframe = engine.get_instance().convert_to_default_dataframe(
-                features
+                features, self._column_names()
             )
         self._training_dataset_engine.insert(
             self, feature_dataframe, write_options, overwrite
@@ -240,6 +263,36 @@ class TrainingDataset:
         """
         return self._training_dataset_engine.read(self, split, read_options)
 
+    def compact(
+        self,
+        target_file_size: Optional[int] = None,
+        rows_per_file: Optional[int] = None,
+    ):
+        """Rewrite the files of the training dataset as fewer, larger files.
+
+        Every split is read and written again with the given file size, and then
+        replaces the original files. Readers should not access the training dataset
+        while it is compacted.
+
+        !!! example "Compact a training dataset written as many small files:"
+            ```python
+            td = fs.get_training_dataset("example_training_dataset", 1)
+            td.compact(target_file_size=256 * 1024 * 1024)
+            ```
+
+        # Arguments
+            target_file_size: Approximate size of the compacted files in bytes,
+                defaults to `None`, 128 MB unless `rows_per_file` is given.
+            rows_per_file: Maximum number of rows per compacted file, defaults to
+                `None`.
+        """
+        write_options = {}
+        if target_file_size is not None:
+            write_options["target_file_size"] = target_file_size
+        if rows_per_file is not None:
+            write_options["rows_per_file"] = rows_per_file
+        self._training_dataset_engine.compact(self, write_options)
+
     def compute_statistics(self):
         """Recompute the statistics for the training dataset and save them to the
         feature store.
@@ -550,6 +603,93 @@ class TrainingDataset:
         """
         return self._training_dataset_engine.query(self, online, with_label)
 
+    def init_prepared_statement(self):
+        """Prepare the statements to look up serving vectors in the online feature
+        store.
+
+        The statements are prepared on the first lookup otherwise, calling this
+        method beforehand moves the metadata requests out of the serving path.
+        """
+        self._vector_server.init_serving(self)
+
+    def get_serving_vector(self, entry: Dict[str, Any]):
+        """Look up the feature vector of an entry in the online feature store.
+
+        The vector contains the features of the training dataset without the label,
+        in the order of the training dataset. Looked up rows can be cached in the
+        process with `hsfs.core.vector_server.enable_cache()`.
+
+        !!! example "Look up the features of a customer for a prediction:"
+            ```python
+            td.get_serving_vector({"customer_id": 42})
+            ```
+
+        # Arguments
+            entry: Primary key values of all feature groups of the training dataset,
+                by primary key name.
+
+        # Returns
+            `list`. Feature values, `None` for features of rows which don't exist.
+
+        # Raises
+            `FeatureStoreException`. If a primary key is missing in the entry.
+        """
+        return self._vector_server.get_feature_vector(self, entry)
+
+    async def get_serving_vector_async(self, entry: Dict[str, Any]):
+        """Look up the feature vector of an entry in the online feature store without
+        blocking the event loop.
+
+        Requires the `aiomysql` package. The feature groups of the training dataset
+        are looked up concurrently, cancelling the returned coroutine cancels the
+        pending lookups.
+
+        !!! example "Look up features in an asyncio application:"
+            ```python
+            vector = await td.get_serving_vector_async({"customer_id": 42})
+            ```
+
+        # Arguments
+            entry: Primary key values of all feature groups of the training dataset,
+                by primary key name.
+
+        # Returns
+            `list`. Feature values, `None` for features of rows which don't exist.
+
+        # Raises
+            `FeatureStoreException`. If a primary key is missing in the entry or
+                `aiomysql` is not installed.
+        """
+        return await self._vector_server.get_feature_vector_async(self, entry)
+
+    def get_serving_vectors(
+        self, entries: List[Dict[str, Any]], dataframe_type: Optional[str] = "numpy"
+    ):
+        """Look up the feature vectors of many entries in the online feature store.
+
+        Each feature group is queried with one lookup per chunk of primary keys and
+        the feature groups of the training dataset are queried concurrently.
+
+        !!! example "Look up the features of a batch of customers:"
+            ```python
+            td.get_serving_vectors([{"customer_id": 42}, {"customer_id": 43}])
+            ```
+
+        # Arguments
+            entries: Primary key values of all feature groups of the training
+                dataset, by primary key name, one dictionary per vector.
+            dataframe_type: str, optional. Possible values are `"numpy"`, `"pandas"`
+                or `"python"`, defaults to `"numpy"`.
+
+        # Returns
+            `np.ndarray`, `pd.DataFrame` or `list`. One feature vector per entry, in
+                the order of the entries.
+
+        # Raises
+            `FeatureStoreException`. If a primary key is missing in an entry.
+        """
+        return self._vector_server.get_feature_vectors(self, entries, dataframe_type)
+
     @property
     def label(self):
         """The label/prediction feature of the training dataset.
@@ -576,3 +716,7 @@ class TrainingDataset:
                         f_name, [feat.name for feat in self._features]
                     )
                 )
+
+    def _column_names(self):
+        # names for the columns of numpy arrays and python lists, which have none
+        return [feat.name for feat in self._features or []] or None
@@ -60,6 +60,12 @@ class TrainingDatasetFeature:
         order of features."""
         return self._index
 
+    @property
+    def featuregroup(self):
+        """Metadata of the feature group the feature was selected from, if the
+        training dataset was created from a query."""
+        return self._featuregroup
+
     @property
     def label(self):
         """Indicator if the feature is part of the prediction label."""
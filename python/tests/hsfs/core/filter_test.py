@@ -0,0 +1,82 @@
+#
+#   Copyright 2020 Logical Clocks AB
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+import unittest
+from unittest import mock
+
+from hsfs import feature
+from hsfs.client.exceptions import FeatureStoreException
+from hsfs.core import fs_query, query
+
+
+class FilterTest(unittest.TestCase):
+    def test_features_compare_by_identity(self):
+        amount = feature.Feature("amount")
+        day = feature.Feature("day")
+
+        self.assertTrue(amount == amount)
+        self.assertFalse(amount == day)
+        self.assertEqual([amount, day].index(day), 1)
+        self.assertNotIn(feature.Feature("amount"), [amount, day])
+
+    def test_to_sql(self):
+        amount = feature.Feature("amount")
+        day = feature.Feature("day")
+        logic = (amount > 10) & (day.eq("it's") | amount.ne(None))
+
+        self.assertEqual(
+            logic.to_sql(lambda feat: feat.name),
+            "(amount > 10 AND (day = 'it\\'s' OR amount IS NOT NULL))",
+        )
+        self.assertEqual(
+            day.eq("it's").to_sql(lambda feat: feat.name, standard_strings=True),
+            "day = 'it''s'",
+        )
+
+    def test_filters_have_no_truth_value(self):
+        amount = feature.Feature("amount")
+
+        with self.assertRaises(TypeError):
+            bool(amount > 10)
+        with self.assertRaises(TypeError):
+            bool((amount > 10) & (amount < 20))
+
+
+class QueryFilterTest(unittest.TestCase):
+    def _query(self, names):
+        return query.Query(
+            "fs", 1, mock.Mock(id=1), [feature.Feature(name) for name in names]
+        )
+
+    def test_apply_filter_wraps_constructed_query(self):
+        q = self._query(["id", "amount"])
+        q.filter(q.left_features[1] > 10)
+        constructed = fs_query.FsQuery("SELECT 1;", None, None, None)
+
+        q.apply_filter(constructed)
+
+        self.assertEqual(
+            constructed.query,
+            "SELECT * FROM (SELECT 1) hsfs_filter WHERE `amount` > 10",
+        )
+        self.assertIsNone(constructed.query_online)
+
+    def test_apply_filter_requires_selected_feature(self):
+        q = self._query(["id"])
+        q.filter(feature.Feature("amount") > 10)
+
+        with self.assertRaises(FeatureStoreException):
+            q.apply_filter(fs_query.FsQuery("SELECT 1", "SELECT 1", None, None))
@@ -0,0 +1,40 @@
+#
+#   Copyright 2020 Logical Clocks AB
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+import unittest
+from unittest import mock
+
+from hsfs.client.exceptions import FeatureStoreException
+from hsfs.core.hive_connection_pool import HiveConnectionPool
+
+
+class HiveConnectionPoolTest(unittest.TestCase):
+    @mock.patch("hsfs.core.hive_connection_pool.time")
+    def test_timeout_closes_expired_connections(self, time_mock):
+        time_mock.time.return_value = 100
+        pool = HiveConnectionPool(
+            lambda database: mock.Mock(), max_size=1, idle_timeout=10, acquire_timeout=0
+        )
+        with pool.connection("other") as other_conn:
+            pass
+
+        with pool.connection("fs"):
+            time_mock.time.return_value = 200
+            with self.assertRaises(FeatureStoreException):
+                pool._acquire("fs")
+
+        other_conn.close.assert_called_once_with()
+        self.assertEqual(pool._size["other"], 0)
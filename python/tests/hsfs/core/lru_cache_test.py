@@ -0,0 +1,59 @@
+#
+#   Copyright 2020 Logical Clocks AB
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+import unittest
+from unittest import mock
+
+from hsfs.core.lru_cache import LRUCache
+
+
+class LRUCacheTest(unittest.TestCase):
+    def test_evicts_least_recently_used(self):
+        cache = LRUCache(2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        cache.get("a")
+        cache.put("c", 3)
+
+        self.assertEqual(cache.get("a"), 1)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("c"), 3)
+        self.assertEqual(cache.hits, 3)
+        self.assertEqual(cache.misses, 1)
+
+    @mock.patch("hsfs.core.lru_cache.time")
+    def test_expires_entries(self, time_mock):
+        time_mock.time.return_value = 100
+        cache = LRUCache(2, ttl=10)
+        cache.put("a", 1)
+        cache.put("b", 2, ttl=30)
+
+        time_mock.time.return_value = 111
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.get("b"), 2)
+        self.assertEqual(len(cache), 1)
+
+    def test_invalidate_where(self):
+        cache = LRUCache(3)
+        cache.put("a", {1, 2})
+        cache.put("b", {2})
+        cache.put("c", {3})
+
+        cache.invalidate_where(lambda key, value: 2 in value)
+
+        self.assertIsNone(cache.get("a"))
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("c"), {3})
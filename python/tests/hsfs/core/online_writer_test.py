@@ -0,0 +1,127 @@
+#
+#   Copyright 2020 Logical Clocks AB
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+import unittest
+from unittest import mock
+
+import pymysql
+
+from hsfs.core import online_writer, util_sql
+
+
+class Counter:
+    def __init__(self):
+        self.value = 0
+
+    def add(self, value):
+        self.value += value
+
+
+class OnlineWriterTest(unittest.TestCase):
+    def test_upsert_sql(self):
+        self.assertEqual(
+            online_writer.upsert_sql("fg_1", ["id", "age", "city"], ["id"]),
+            "INSERT INTO `fg_1` (`id`, `age`, `city`) VALUES (%s, %s, %s) "
+            "ON DUPLICATE KEY UPDATE `age` = VALUES(`age`), `city` = VALUES(`city`)",
+        )
+
+    def test_upsert_sql_only_primary_keys(self):
+        self.assertEqual(
+            online_writer.upsert_sql("fg_1", ["id"], ["id"]),
+            "INSERT INTO `fg_1` (`id`) VALUES (%s) "
+            "ON DUPLICATE KEY UPDATE `id` = VALUES(`id`)",
+        )
+
+    @mock.patch.object(online_writer.time, "sleep")
+    @mock.patch.object(online_writer.pymysql, "connect")
+    def test_write_partition_retries_batch(self, connect, sleep):
+        executed = []
+
+        def executemany(sql, batch):
+            if len(executed) == 1 and connect.call_count == 1:
+                raise pymysql.err.OperationalError(2013, "Lost connection")
+            executed.append(batch)
+
+        cursor = connect.return_value.cursor.return_value.__enter__.return_value
+        cursor.executemany.side_effect = executemany
+        rows_written = Counter()
+
+        online_writer.write_partition(
+            iter([(1, 30), (2, 40), (3, 50)]),
+            {"host": "localhost"},
+            "sql",
+            batch_size=2,
+            retries=1,
+            rows_written=rows_written,
+        )
+
+        self.assertEqual(executed, [[(1, 30), (2, 40)], [(3, 50)]])
+        self.assertEqual(connect.call_count, 2)
+        self.assertEqual(rows_written.value, 3)
+
+    @mock.patch.object(online_writer.time, "sleep")
+    @mock.patch.object(online_writer.pymysql, "connect")
+    def test_write_partition_fails_after_retries(self, connect, sleep):
+        cursor = connect.return_value.cursor.return_value.__enter__.return_value
+        cursor.executemany.side_effect = pymysql.err.OperationalError(1213, "Deadlock")
+
+        with self.assertRaises(pymysql.err.OperationalError):
+            online_writer.write_partition(
+                iter([(1, 30)]), {}, "sql", batch_size=2, retries=2
+            )
+        self.assertEqual(cursor.executemany.call_count, 3)
+
+
+class ConnectionOptionsTest(unittest.TestCase):
+    def _options(self, url):
+        return util_sql.get_mysql_connection_options(
+            {"url": url, "user": "user", "password": "secret"}
+        )
+
+    def test_plain_url(self):
+        self.assertEqual(
+            self._options("jdbc:mysql://db.local:3307/fs?useSSL=false"),
+            {
+                "host": "db.local",
+                "port": 3307,
+                "db": "fs",
+                "user": "user",
+                "password": "secret",
+            },
+        )
+
+    def test_url_parameters(self):
+        options = self._options(
+            "jdbc:mysql://db.local/fs?useSSL=true&trustServerCertificate=true"
+            "&connectTimeout=5000&socketTimeout=30000"
+        )
+
+        self.assertEqual(
+            options["ssl"], {"verify_mode": "none", "check_hostname": False}
+        )
+        self.assertEqual(options["connect_timeout"], 5)
+        self.assertEqual(options["read_timeout"], 30)
+        self.assertEqual(options["write_timeout"], 30)
+
+    def test_verify_identity(self):
+        options = self._options(
+            "jdbc:mysql://db.local/fs?sslMode=VERIFY_IDENTITY&serverSslCert=/ca.pem"
+        )
+
+        self.assertEqual(
+            options["ssl"],
+            {"verify_mode": "required", "check_hostname": True, "ca": "/ca.pem"},
+        )
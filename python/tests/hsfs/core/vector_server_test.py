@@ -0,0 +1,374 @@
+#
+#   Copyright 2020 Logical Clocks AB
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+import asyncio
+import sqlite3
+import unittest
+from unittest import mock
+
+from hsfs import feature, feature_group, training_dataset_feature
+from hsfs.core import vector_server
+
+
+class SQLiteCursor:
+    """Asynchronous cursor with the interface of aiomysql, backed by SQLite."""
+
+    def __init__(self, conn):
+        self._conn = conn
+        self._cursor = conn.db.cursor()
+
+    async def execute(self, sql, parameters):
+        await asyncio.sleep(self._conn.latency)
+        # SQLite uses qmark instead of format placeholders and double quotes
+        self._cursor.execute(sql.replace("%s", "?").replace("`", '"'), parameters)
+
+    async def fetchone(self):
+        return self._cursor.fetchone()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        self._cursor.close()
+
+
+class SQLiteConnection:
+    def __init__(self, db, latency):
+        self.db = db
+        self.latency = latency
+        self.closed = False
+
+    def cursor(self):
+        return SQLiteCursor(self)
+
+    def close(self):
+        self.closed = True
+
+
+class SQLitePool:
+    """Stand-in for an aiomysql pool of connections to the online feature store."""
+
+    def __init__(self, db, latency=0):
+        self._db = db
+        self._latency = latency
+        self.idle = []
+        self.in_use = 0
+        self.max_in_use = 0
+
+    async def acquire(self):
+        conn = self.idle.pop() if self.idle else SQLiteConnection(self._db, 0)
+        conn.latency = self._latency
+        self.in_use += 1
+        self.max_in_use = max(self.max_in_use, self.in_use)
+        return conn
+
+    def release(self, conn):
+        self.in_use -= 1
+        if not conn.closed:
+            self.idle.append(conn)
+
+
+class SQLiteSyncConnection:
+    """Connection with the cursor interface of PyMySQL, backed by SQLite."""
+
+    def __init__(self, db):
+        self._db = db
+
+    def cursor(self):
+        return SQLiteSyncCursor(self._db.cursor())
+
+
+class SQLiteSyncCursor:
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def execute(self, sql, parameters):
+        self._cursor.execute(sql.replace("%s", "?").replace("`", '"'), parameters)
+
+    def fetchone(self):
+        return self._cursor.fetchone()
+
+    def fetchall(self):
+        return self._cursor.fetchall()
+
+    def close(self):
+        self._cursor.close()
+
+
+class PreparedStatementTest(unittest.TestCase):
+    def setUp(self):
+        self.db = sqlite3.connect(":memory:")
+        self.db.executescript("""
+            CREATE TABLE customers_1 (id INTEGER PRIMARY KEY, age INTEGER, city TEXT);
+            INSERT INTO customers_1 VALUES (1, 30, 'Stockholm');
+            """)
+        self.conn = SQLiteSyncConnection(self.db)
+        self.customers = _feature_group("customers", 1, ["id", "age", "city"])
+        vector_server.enable_cache()
+
+    def tearDown(self):
+        vector_server.disable_cache()
+        self.db.close()
+
+    def test_cached_lookup_of_other_features(self):
+        ages = vector_server.PreparedStatement(self.customers, ["age"])
+        cities = vector_server.PreparedStatement(self.customers, ["city"])
+
+        self.assertEqual(ages.lookup(self.conn, {"id": 1}), {"age": 30})
+        self.assertIsNone(cities.cached_lookup({"id": 1}))
+        self.assertEqual(cities.lookup(self.conn, {"id": 1}), {"city": "Stockholm"})
+        self.assertEqual(ages.cached_lookup({"id": 1}), {"age": 30})
+        self.assertEqual(cities.cached_lookup({"id": 1}), {"city": "Stockholm"})
+
+    def test_batch_lookup_matches_rows_by_position(self):
+        self.db.executescript("""
+            CREATE TABLE accounts_1 (id TEXT PRIMARY KEY, balance INTEGER);
+            INSERT INTO accounts_1 VALUES ('42', 1), ('7', 2);
+            """)
+        accounts = _feature_group("accounts", 2, ["id", "balance"])
+        balances = vector_server.PreparedStatement(accounts, ["balance"])
+
+        rows = balances.batch_lookup(
+            self.conn, [{"id": 42}, {"id": "7"}, {"id": 1}, {"id": 42}], chunk_size=2
+        )
+
+        self.assertEqual(
+            rows, [{"balance": 1}, {"balance": 2}, {"balance": None}, {"balance": 1}]
+        )
+
+
+class VectorServerTestCase(unittest.TestCase):
+    """Vector server of a training dataset of the customers and orders feature
+    groups, backed by SQLite."""
+
+    def setUp(self):
+        self.db = sqlite3.connect(":memory:", check_same_thread=False)
+        self.db.executescript("""
+            CREATE TABLE customers_1 (id INTEGER PRIMARY KEY, age INTEGER);
+            INSERT INTO customers_1 VALUES (1, 30), (2, 40);
+            CREATE TABLE orders_1 (id INTEGER PRIMARY KEY, amount REAL);
+            INSERT INTO orders_1 VALUES (1, 9.5);
+            """)
+        customers = _feature_group("customers", 1, ["id", "age"])
+        orders = _feature_group("orders", 2, ["id", "amount"])
+
+        self.training_dataset = mock.Mock()
+        self.training_dataset.schema = [
+            training_dataset_feature.TrainingDatasetFeature(
+                "amount", "double", 1, {"name": "orders", "version": 1}
+            ),
+            training_dataset_feature.TrainingDatasetFeature(
+                "age", "int", 0, {"name": "customers", "version": 1}
+            ),
+        ]
+
+        self.vector_server = vector_server.VectorServer(1)
+        self.vector_server._feature_group_api = mock.Mock()
+        self.vector_server._feature_group_api.get.side_effect = lambda name, *args: {
+            "customers": customers,
+            "orders": orders,
+        }[name]
+
+    def tearDown(self):
+        self.db.close()
+
+
+class VectorServerTest(VectorServerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.vector_server._run_lookup = lambda lookup: lookup(
+            SQLiteSyncConnection(self.db)
+        )
+
+    def test_get_feature_vector(self):
+        self.assertEqual(
+            self.vector_server.get_feature_vector(self.training_dataset, {"id": 1}),
+            [30, 9.5],
+        )
+        self.assertEqual(
+            self.vector_server.get_feature_vector(self.training_dataset, {"id": 2}),
+            [40, None],
+        )
+
+    def test_get_feature_vectors(self):
+        entries = [{"id": 2}, {"id": 1}, {"id": 3}, {"id": 2}]
+
+        for chunk_size in [1, 2, 10]:
+            vectors = self.vector_server.get_feature_vectors(
+                self.training_dataset, entries, "python", chunk_size=chunk_size
+            )
+
+            self.assertEqual(vectors, [[40, None], [30, 9.5], [None, None], [40, None]])
+
+    def test_get_feature_vectors_pandas(self):
+        vectors = self.vector_server.get_feature_vectors(
+            self.training_dataset, [{"id": 1}, {"id": 2}], "pandas"
+        )
+
+        self.assertEqual(list(vectors.columns), ["age", "amount"])
+        self.assertEqual(vectors["age"].tolist(), [30, 40])
+
+    def test_get_feature_vectors_no_entries(self):
+        self.assertEqual(
+            self.vector_server.get_feature_vectors(self.training_dataset, [], "python"),
+            [],
+        )
+
+    def test_batch_sql(self):
+        prepared_statement = vector_server.PreparedStatement(
+            _feature_group("customers", 1, ["id", "age"]), ["age"]
+        )
+
+        self.assertEqual(
+            prepared_statement._batch_sql(2),
+            "SELECT `keys`.`hsfs_key_index`, `fg`.`age` FROM ("
+            "SELECT 0 AS `hsfs_key_index`, %s AS `hsfs_key_0` UNION ALL "
+            "SELECT 1 AS `hsfs_key_index`, %s AS `hsfs_key_0`"
+            ") `keys` JOIN `customers_1` `fg` ON `fg`.`id` = `keys`.`hsfs_key_0`",
+        )
+
+    def test_batch_sql_composite_primary_key(self):
+        fg = feature_group.FeatureGroup(
+            name="orders",
+            version=2,
+            featurestore_id=1,
+            id=3,
+            features=[
+                feature.Feature("customer_id", primary=True),
+                feature.Feature("order_id", primary=True),
+                feature.Feature("amount"),
+            ],
+        )
+        prepared_statement = vector_server.PreparedStatement(fg, ["amount"])
+
+        self.assertEqual(
+            prepared_statement._batch_sql(1),
+            "SELECT `keys`.`hsfs_key_index`, `fg`.`amount` FROM ("
+            "SELECT 0 AS `hsfs_key_index`, %s AS `hsfs_key_0`, %s AS `hsfs_key_1`"
+            ") `keys` JOIN `orders_2` `fg` ON `fg`.`customer_id` = "
+            "`keys`.`hsfs_key_0` AND `fg`.`order_id` = `keys`.`hsfs_key_1`",
+        )
+
+
+class VectorServerAsyncTest(VectorServerTestCase):
+    def test_get_feature_vector_async(self):
+        pool = SQLitePool(self.db)
+
+        vector = self._run(
+            self.vector_server.get_feature_vector_async(
+                self.training_dataset, {"id": 1}
+            ),
+            pool,
+        )
+
+        self.assertEqual(vector, [30, 9.5])
+        self.assertEqual(pool.in_use, 0)
+
+    def test_get_feature_vector_async_missing_row(self):
+        vector = self._run(
+            self.vector_server.get_feature_vector_async(
+                self.training_dataset, {"id": 2}
+            ),
+            SQLitePool(self.db),
+        )
+
+        self.assertEqual(vector, [40, None])
+
+    def test_get_feature_vector_async_concurrent(self):
+        pool = SQLitePool(self.db, latency=0.01)
+
+        async def lookups():
+            return await asyncio.gather(
+                *[
+                    self.vector_server.get_feature_vector_async(
+                        self.training_dataset, {"id": i % 2 + 1}
+                    )
+                    for i in range(10)
+                ]
+            )
+
+        vectors = self._run(lookups(), pool)
+
+        self.assertEqual(vectors, [[30, 9.5], [40, None]] * 5)
+        self.assertGreater(pool.max_in_use, 2)
+
+    def test_get_feature_vector_async_bounded_by_pool_size(self):
+        pool = SQLitePool(self.db, latency=0.01)
+        self.vector_server.ASYNC_POOL_SIZE = 3
+
+        async def lookups():
+            return await asyncio.gather(
+                *[
+                    self.vector_server.get_feature_vector_async(
+                        self.training_dataset, {"id": 1}
+                    )
+                    for i in range(10)
+                ]
+            )
+
+        self._run(lookups(), pool)
+
+        # lookups wait for a slot instead of a connection of the pool
+        self.assertEqual(pool.max_in_use, 3)
+
+    def test_get_feature_vector_async_cancel(self):
+        pool = SQLitePool(self.db, latency=10)
+
+        async def cancelled_lookup():
+            task = asyncio.ensure_future(
+                self.vector_server.get_feature_vector_async(
+                    self.training_dataset, {"id": 1}
+                )
+            )
+            await asyncio.sleep(0.01)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+
+        self._run(cancelled_lookup(), pool)
+
+        # connections with pending queries are not reused
+        self.assertEqual(pool.in_use, 0)
+        self.assertEqual(pool.idle, [])
+
+    def _run(self, coroutine, pool):
+        async def create_pool(**kwargs):
+            self.assertEqual(kwargs["host"], "localhost")
+            self.assertEqual(kwargs["db"], "project")
+            return pool
+
+        online_conn = self.vector_server._storage_connector_api = mock.Mock()
+        online_conn.get_online_connector.return_value.spark_options.return_value = {
+            "url": "jdbc:mysql://localhost:3306/project?useSSL=false",
+            "user": "user",
+            "password": "password",
+        }
+        with mock.patch.object(vector_server, "aiomysql") as aiomysql:
+            aiomysql.create_pool = create_pool
+            return asyncio.run(coroutine)
+
+
+def _feature_group(name, id, feature_names):
+    return feature_group.FeatureGroup(
+        name=name,
+        version=1,
+        featurestore_id=1,
+        id=id,
+        features=[
+            feature.Feature(feature_name, primary=feature_name == "id")
+            for feature_name in feature_names
+        ],
+    )
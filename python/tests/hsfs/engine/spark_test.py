@@ -0,0 +1,54 @@
+#
+#   Copyright 2020 Logical Clocks AB
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from hsfs.engine import spark
+
+
+class ConvertToDefaultDataframeTest(unittest.TestCase):
+    def setUp(self):
+        self._engine = spark.Engine.__new__(spark.Engine)
+        self._engine._spark_session = mock.Mock()
+
+    def _converted(self):
+        return self._engine._spark_session.createDataFrame.call_args[0][0]
+
+    def test_array_columns_named_after_schema(self):
+        self._engine.convert_to_default_dataframe(
+            np.array([[1, 2.0], [3, 4.0]]), ["id", "amount"]
+        )
+
+        self.assertEqual(list(self._converted().columns), ["id", "amount"])
+
+    def test_array_columns_without_schema(self):
+        self._engine.convert_to_default_dataframe([[1, 2], [3, 4]])
+
+        self.assertEqual(list(self._converted().columns), ["col_0", "col_1"])
+
+    def test_array_column_count_must_match_schema(self):
+        with self.assertRaises(ValueError):
+            self._engine.convert_to_default_dataframe(
+                np.array([[1, 2.0, 3], [4, 5.0, 6]]), ["id", "amount"]
+            )
+        with self.assertRaises(ValueError):
+            self._engine.convert_to_default_dataframe(
+                np.array([(1, 2.0)], dtype=[("a", "i8"), ("b", "f8")]), ["id"]
+            )
+        self._engine._spark_session.createDataFrame.assert_not_called()